@@ -11,6 +11,10 @@ Output: properly formated lines for a string_1.dat file
 
 # imports
 import sys, os
+# the shared string method modules live in string_method/scripts
+sys.path.append( os.path.join( os.path.dirname( os.path.abspath( __file__ ) ),
+                               os.pardir, "string_method", "scripts" ) )
+import string_io
 
 # read-in arguments
 try:
@@ -30,8 +34,6 @@ with open( csv_file, 'r' ) as fh:
 # create a string_1.dat file lines
 # the line format should be "phi,psi" or "phi,psi,step"
 # so split on comma
-for line, ii in zip( lines, range(len(lines) ) ):
-    line = line.strip()
-    print "# Image %s" %ii
-    print line.split(',')[0]
-    print line.split(',')[1]
+string = [ ( float( line.split(',')[0] ), float( line.split(',')[1] ) )
+           for line in lines if line.strip() ]
+string_io.print_string( string )
@@ -10,6 +10,10 @@ Output: properly formated lines for a coords.csv
 
 # imports
 import sys, os
+# the shared string method modules live in string_method/scripts
+sys.path.append( os.path.join( os.path.dirname( os.path.abspath( __file__ ) ),
+                               os.pardir, "string_method", "scripts" ) )
+import string_io
 
 # read-in arguments
 try:
@@ -21,16 +25,13 @@ if not os.path.isfile( dat_file ):
     print "\nYou did not give me a valid filepath.\n"
     sys.exit()
 
-# open and read csv file
-# start at second line because need to skip header
-with open( dat_file, 'r' ) as fh:
-    lines = fh.readlines()[1:]
+# read the dat file, one ( phi, psi ) row per image
+phi_psi = string_io.read_string( dat_file, 2 )
 
 # create a coods.csv file
 # the line format should be "phi,psi"
-lines = [ line.strip() for line in lines if not line.startswith( '#' ) ]
-phi = [ line for line in lines[::2] ]
-psi = [ line for line in lines[1::2] ]
+phi = [ repr( val ) for val in phi_psi[:,0].tolist() ]
+psi = [ repr( val ) for val in phi_psi[:,1].tolist() ]
 
 print "phi,psi,step"
 for ii in range( len( phi ) ):
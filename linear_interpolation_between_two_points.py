@@ -9,7 +9,11 @@ Args:  python <script>.py float, float, float, float, int
 '''
 
 # imports
-import sys
+import sys, os
+# the shared string method modules live in string_method/scripts
+sys.path.append( os.path.join( os.path.dirname( os.path.abspath( __file__ ) ),
+                               "string_method", "scripts" ) )
+import pbc, string_io
 
 # get the right input arguments
 # phi1
@@ -60,29 +64,17 @@ except ValueError:
 
 
 # get the distance between each step
-phi_step = ( phi2 - phi1 ) / steps
-psi_step = ( psi2 - psi1 ) / steps
+# the short way around for the angles ( see pbc.py )
+phi_step, psi_step = pbc.difference( ( phi1, psi1 ), ( phi2, psi2 ) ) / steps
 
 # linear interpolation to get the coords
 # plus one for steps because the first point should be phi1/psi1
 phi_coords = [ round( phi1 + ( ii * phi_step ), 3 ) for ii in range( steps + 1 ) ]
 psi_coords = [ round( psi1 + ( ii * psi_step ), 3 ) for ii in range( steps + 1) ]
-phi_psi_coords = zip( phi_coords, psi_coords )
+phi_psi_coords = list( zip( phi_coords, psi_coords ) )
 
 # keep phi,psi values within -180, 180
-for ii in range( steps + 1 ):
-    phi = phi_psi_coords[ii][0]
-    psi = phi_psi_coords[ii][1]
-    while phi > 180:
-        phi -= 360
-    while phi < -180:
-        phi += 360
-    while psi > 180:
-        psi -= 360
-    while psi < -180:
-        psi += 360
-    # print to screen the appropriate lines
-    # for a string_1.dat file
-    print "# Image %s" %ii
-    print phi
-    print psi
+string = pbc.wrap( phi_psi_coords )
+# print to screen the appropriate lines
+# for a string_1.dat file
+string_io.print_string( string )
@@ -8,6 +8,10 @@ Uses the /path/to/dat files to construct a graph. Ensure the format of the dat f
 # imports
 import sys, os
 from math import ceil, floor
+# the shared string method modules live in string_method/scripts
+sys.path.append( os.path.join( os.path.dirname( os.path.abspath( __file__ ) ),
+                               "string_method", "scripts" ) )
+import string_io
 try:
     import matplotlib
 except ImportError:
@@ -58,37 +62,17 @@ total_changes = []
 # skip the first dat file
 # string_1.dat has no previous dat file
 for ii in range( 2, last_dat_file_num + 1 ):
-    # open this dat file
-    with open( dat_dir + "string_%s.dat" %ii , 'r' ) as fh:
-        cur_dat_file = fh.readlines()
-    # open the previous dat file
-    with open( dat_dir + "string_%s.dat" %( ii - 1 ), 'r' ) as fh:
-        prev_dat_file = fh.readlines()
-    # get the phi and psi values from each dat file
-    # dat file looks like below, so phis come first, then psi
-    '''
-    # Image n
-    phi
-    psi
-    '''
-    # cur phi
-    cur_dat_phi = [ float( l.strip() ) for l in cur_dat_file
-                    if not l.startswith( '#' ) ][::2]
-    # cur psi
-    cur_dat_psi = [ float( l.strip() ) for l in cur_dat_file
-                    if not l.startswith( '#' ) ][1::2]
-    # prev phi
-    prev_dat_phi = [ float( l.strip() ) for l in prev_dat_file
-                     if not l.startswith( '#' ) ][::2]
-    # prev psi
-    prev_dat_psi = [ float( l.strip() ) for l in prev_dat_file
-                     if not l.startswith( '#' ) ][1::2]
-    # count the number of images as lines that start with #
-    nimages = len( [ jj for jj in cur_dat_file
-                     if jj.startswith( '#' ) ] )
+    # read this dat file and the previous dat file
+    # string_io gives one ( phi, psi ) row per image
+    cur_dat = string_io.read_string( dat_dir + "string_%s.dat" %ii, 2 )
+    prev_dat = string_io.read_string( dat_dir + "string_%s.dat" %( ii - 1 ), 2 )
+    # the phi values are the first column, psi the second
+    cur_dat_phi, cur_dat_psi = cur_dat[:,0], cur_dat[:,1]
+    prev_dat_phi, prev_dat_psi = prev_dat[:,0], prev_dat[:,1]
+    # the number of images is the number of rows
+    nimages = len( cur_dat )
     # ensure they're the same between current and previous
-    nimages_prev = len( [ jj for jj in prev_dat_file
-                          if jj.startswith( '#' ) ] )
+    nimages_prev = len( prev_dat )
     if not nimages_prev == nimages:
         print "\nThe number of images between string_%s.dat and string_%s.dat are not the same. What happened here?\n" %( nimages_prev, nimages )
         sys.exit()
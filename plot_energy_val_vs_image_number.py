@@ -3,15 +3,24 @@ __author__="morganlnance"
 
 '''
 This script needs an alad_2d_pmf.dat file and a string_100.dat file or a /path/to/dat files
+
+Usage: python <script.py> pmf_file.dat /path/to/string_file(s) string_number [pmf_mode]
+pmf_mode is nearest (default), bilinear or bicubic
 '''
 
 # open input argument file
 # read in the phi, psi, and third variable data
 # third variable is energy (pmf)
 import sys, os
+# the shared string method modules live in string_method/scripts
+sys.path.append( os.path.join( os.path.dirname( os.path.abspath( __file__ ) ),
+                               "string_method", "scripts" ) )
+import string_io, pmf_surface
 try:
-    with open( sys.argv[1], "r" ) as fh:
-        data = fh.readlines()
+    pmf_file = sys.argv[1]
+    if not os.path.isfile( pmf_file ):
+        print "\n%s is not a valid pmf file path.\n" %pmf_file
+        sys.exit()
 except IndexError:
     print "\nI need a .dat file. Should be a pmf file.\n"
     sys.exit()
@@ -39,6 +48,15 @@ try:
 except IndexError:
     print "\nGive me the string number for this path. For the graph.\n"
     sys.exit()
+# optional, how to get energies between the pmf grid points
+# nearest (closest grid point), bilinear or bicubic
+try:
+    pmf_mode = sys.argv[4]
+except IndexError:
+    pmf_mode = "nearest"
+if pmf_mode not in pmf_surface.MODES:
+    print "\nThe pmf mode should be one of %s.\n" %", ".join( pmf_surface.MODES )
+    sys.exit()
 
 
 # import needed functions now that file is read in
@@ -57,15 +75,10 @@ import numpy as np
 #######
 # PMF #
 #######
-# extract the three sets of data from the pmf file
-# ( phi, psi ) = energy
-pmf_data_dict = {}
-# there should be three columns in the data file
-# pmf_data_dict[ ( phi, psi ) ] = energy
-for line in data:
-    pmf_data_dict[ ( float( line.split()[0] ) ), 
-               float( line.split()[1] ) ] = float( line.split()[2] )
-pmf_phi_psi = pmf_data_dict.keys()
+# load the pmf file once into a regular phi,psi grid
+# pmf.nearest( points ) gives the energy of the grid bin
+# closest to each ( phi, psi ) point by index arithmetic
+pmf = pmf_surface.read_pmf( pmf_file )
 
 
 #######
@@ -127,42 +140,18 @@ lowest_string_E_key = None
 for dat_key, ii in zip( keys, color_idx ):
     # dat_dict[ string_number ] = /path/to/that/string file
     dat_file = dat_dict[dat_key]
-    # open and read the data from the string_<>.dat file
-    with open( dat_file, 'r' ) as fh:
-        dat_data = fh.readlines()
-    # extract the data from the string_<>.dat file
-    all_dat_phi_psi = [ round( float( line.strip() ), 1 ) 
-                        for line in dat_data if not line.startswith( '#' ) ]
-    dat_phi_psi = zip( all_dat_phi_psi[::2], all_dat_phi_psi[1::2] )
-
-    # compare all phi,psi for each dat file
-    # to the phi,psi combos from the pmf file
-    energies = []
-    # for every phi,psi image of this string
-    for phi_psi in dat_phi_psi:
-        # initiate holders for this round
-        min_diff = None
-        energy = None
-        close_match = None
-        # for each phi,psi combo from the pmf file
-        for pmf_pp in pmf_phi_psi:
-            # sum( abs((pmf_phi - dat_phi)), abs((pmf_psi - dat_psi)) )
-            diff = sum( ( abs((pmf_pp[0]-phi_psi[0])), 
-                          abs((pmf_pp[1]-phi_psi[1])) ) )
-            # keep track of the min_diff and the corresponding
-            # phi,psi combo from the pmf file
-            if min_diff is None or diff < min_diff:
-                min_diff = diff
-                energy = pmf_data_dict[ pmf_pp ]
-                close_match = pmf_pp
-        # the energy associated with this dat file phi,psi
-        # has been found using the closest match phi,psi
-        # pair in the umbrella sampling pmf file
-        energies.append( energy )
-        # collect the max_energy out of each image seen
-        # as to set a proper y-lim on the plot
-        if max_energy is None or energy > max_energy:
-            max_energy = energy
+    # read the ( phi, psi ) rows of the string_<>.dat file
+    dat_phi_psi = string_io.read_string( dat_file, 2 )
+
+    # look up the energy of every phi,psi image of this
+    # string at once, using the closest phi,psi bin
+    # of the umbrella sampling pmf file or interpolating
+    # between the bins, depending on pmf_mode
+    energies = pmf.energy( dat_phi_psi, pmf_mode ).tolist()
+    # collect the max_energy out of each image seen
+    # as to set a proper y-lim on the plot
+    if max_energy is None or max( energies ) > max_energy:
+        max_energy = max( energies )
 
     # store the sum of the energies of each image (ie
     # the energy of this string) in the energy_of_string_dict
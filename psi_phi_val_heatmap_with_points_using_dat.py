@@ -12,6 +12,10 @@ Example: python psi_phi_val_heatmap_with_points_using_dat_files.py alad_2d_pmf.d
 # read in the phi, psi, and third variable data
 # third variable can be energy (pmf) or count (bia)
 import sys, os
+# the shared string method modules live in string_method/scripts
+sys.path.append( os.path.join( os.path.dirname( os.path.abspath( __file__ ) ),
+                               "string_method", "scripts" ) )
+import pbc, string_io
 try:
     with open( sys.argv[1], "r" ) as fh:
         data = fh.readlines()
@@ -120,37 +124,23 @@ for dat_file in dat_filenames:
     # entries should range from 1 to number of cycles
     key = int( dat_file.split('/')[-1].split(".dat")[0].split('_')[-1] )
     keys.append( key )
-    # make an empty phi_psi_coords holder
-    # will hold phi and psi data as it comes, like
-    # phi1, psi1, phi2, psi2, ..., phin, psin
-    # then phi and psi will be passed to the dat_dict
-    # final form as dat_dict[ key ] = [ [phi1, psi1], [phi2, psi2], etc ]
-    phi_psi_coords = []
-    # open the file
-    with open( dat_file, "r" ) as fh:
-        lines = fh.readlines()
-        # format of a string_<>.dat file is
-        '''
-        # Image 0
-        phi
-        psi
-        # Image 1
-        phi
-        psi
-        etc...
-        '''
-        for line in lines:
-            line = line.strip()
-            # skip lines that start with a comment
-            if not line.startswith( '#' ):
-                phi_psi_coords.append( line )
-        # add the [ phi, psi ] data for each dat_file entry
-        # [ phi1, psi1, phi2, psi2, ..., phin, psin ]
-        # you have to pull out every other element for phi and for psi
-        dat_dict_phi[ key ] = phi_psi_coords[::2]
-        dat_dict_psi[ key ] = phi_psi_coords[1::2]
-        # a bit too fancy of a way to do it
-        #dat_dict[ key ] = [ [x,y] for x, y in zip( phi_psi_coords[::2], phi_psi_coords[1::2] ) ]
+    # read the string_<>.dat file, one ( phi, psi ) row per image
+    # format of a string_<>.dat file is
+    '''
+    # Image 0
+    phi
+    psi
+    # Image 1
+    phi
+    psi
+    etc...
+    '''
+    # strings continue past +-180 across the seam,
+    # so wrap them back onto the -180,180 axes, see pbc.py
+    phi_psi_coords = pbc.wrap( string_io.read_string( dat_file, 2 ) )
+    # phi is the first column and psi is the second
+    dat_dict_phi[ key ] = phi_psi_coords[:,0]
+    dat_dict_psi[ key ] = phi_psi_coords[:,1]
 
 
 # sort the keys to plot dat files in order so that
@@ -3,56 +3,58 @@ __author__="morganlnance"
 
 
 '''
-Used to play with the math and form of the simulated annealing function used in the push_string.oy code
+Used to play with the math and form of the simulated annealing function used in the push_string.py code
+
+Usage: python <script>.py [schedule] [ncycles] [param=value ...] [plot.png]
+Arguments: schedule    (cosine, exponential, linear, restarts or table, default cosine)
+           ncycles     (the number of cycles to show, default 100)
+           param=value (the parameters of the schedule, default period=25)
+           plot.png    (where to save a plot, default simulated_annealing.png)
+
+The schedule is the same table the push and the nearest-neighbor
+gating of the string method use, see string_method/scripts/annealing.py
+Renders without a display: a text chart is printed, and the plot is
+saved to a file when matplotlib is installed
 '''
 
 
 # imports
-try:
-    import matplotlib
-except ImportError:
-    print "\nI need matplotlib to work\n"
-    sys.exit()
-# setting to ensure plot pops up on a Mac
-matplotlib.use( "TKAgg" )
-import matplotlib.pyplot as plt
-plt.rcParams.update( { "font.size" : 14 } )
-# simulated annealing math
-from math import cos, pi, ceil
-
-
-# simulated annealing function
-def simulated_annealing( cycle, period ):
-    '''
-    Depending on which cycle number you are on,
-    calculate the level of pushing based on a
-    simulated annealing approach utilizing a
-    cycle number and a period
-    :param cycle: int( cycle number of string method )
-    :param period: float( length of one period of simulated annealing curve )
-    :return: float( amount of "push" to give to image )
-    '''
-    # (1/2) * cos( 2*pi * (cycle/period) - pi ) + 1/2
-    return 0.5 * cos((( 2 * pi ) * ( float( cycle ) / float( period ))) - pi ) + 0.5
+import sys, os
+# the shared string method modules live in string_method/scripts
+sys.path.append( os.path.join( os.path.dirname( os.path.abspath( __file__ ) ),
+                               "string_method", "scripts" ) )
+import annealing
 
 
 # calculate simulated annealing data
 # period of 25 with the intent of using 100 cycles
 # meaning 5 points of no push, 4 points of max push
-period = 25
-cycles = range( 100 )
-multiplier = 1
-data = [ multiplier * simulated_annealing( cycle, period ) 
-         for cycle in cycles ]
-
-
-# plot
-plt.scatter( cycles, data )
-plt.plot( cycles, data, '--' )
-plt.xlim( [ 0, len(cycles) ] )
-plt.xlabel( "Cycles" )
-plt.ylim( [ 0, ceil(max(data)) ] )
-plt.ylabel( "Simulated Annealing Push" )
-title = "(1/2) * cos( 2*pi * (cycle/period) - pi ) + 1/2"
-plt.title( title, fontsize=16, y=1.02 )
-plt.show(block=False)
+name = "cosine"
+ncycles = 100
+params = { "period" : annealing.PERIOD }
+png = "simulated_annealing.png"
+args = sys.argv[1:]
+if len( args ) > 0:
+    name = args.pop( 0 )
+    params = {}
+if len( args ) > 0:
+    ncycles = int( args.pop( 0 ) )
+if len( args ) > 0 and "=" not in args[-1]:
+    png = args.pop()
+params.update( annealing.parse_params( args ) )
+
+schedule = annealing.Schedule( name, ncycles, **params )
+
+
+# text chart, N marks the cycles with nearest-neighbor knot removal
+print "\n".join( annealing.text_chart( schedule ) )
+
+
+# plot, with the Agg backend so no window is needed
+try:
+    import matplotlib
+except ImportError:
+    print "\nNo matplotlib, not saving %s\n" %png
+    sys.exit()
+annealing.plot( schedule, png )
+print "\nSaved %s\n" %png
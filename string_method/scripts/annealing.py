@@ -0,0 +1,237 @@
+#!/usr/bin/python
+
+""" annealing.py: Simulated annealing schedules of the string push
+
+      Usage: import annealing
+             schedule = annealing.Schedule('cosine', ncycles, period=25.)
+             schedule.fraction(cycle), schedule.calc_nn(cycle)
+
+             python annealing.py <name> <ncycles> [param=value ...] [png]
+
+      Description: A schedule gives the fraction of the full push
+                   (string_push.MULTIPLIER) of every cycle. It is evaluated
+                   once for cycles 0 to ncycles into a table that the push
+                   and the nearest-neighbor gating both read, so the two
+                   always agree. The shapes, with their parameters:
+
+                     cosine      - period; the original curve,
+                                   0.5 * cos(2 pi cycle / period - pi) + 0.5
+                     exponential - tau; exp(-(cycle - 1) / tau)
+                     linear      - start, stop, length; a ramp from start
+                                   to stop over cycles 1 to length, then
+                                   stop
+                     restarts    - period, mult; a half cosine from 1 down
+                                   to 0 over period cycles, restarted at 1
+                                   with the period multiplied by mult
+                     table       - fname; user defined, lines of
+                                   'cycle fraction', the fraction holds
+                                   until the next listed cycle
+
+                   Knots are removed on the optimization cycles, those
+                   where the push is not growing: fraction(cycle) <=
+                   fraction(cycle - 1). For the cosine with a whole number
+                   period these are the cycles past the top of each period,
+                   as before.
+
+                   The command line renders a schedule without a display:
+                   a text chart, and a png through matplotlib's Agg backend
+                   when a file name is given (see simulated_annealing_fxn.py).
+
+      Input: name - the shape of the schedule, see above
+             ncycles - the last cycle of the table
+             param=value - the parameters of the shape
+             png - file name of a plot of the schedule
+
+      Output: The text chart of the schedule, and the png if given
+                                                                         """
+
+import sys
+import numpy as np
+
+PERIOD   = 25.0     # cycles per simulated annealing period
+NCYCLES  = 200      # default length of a table
+SCHEDULE = 'cosine'
+GROWTH   = 1.e-9    # a fraction this much above the previous one is growing
+
+#--------#
+# Shapes #
+#--------#
+
+def cosine(cycles, period=PERIOD):
+  """The original curve, 0 at multiples of the period and 1 half way"""
+
+  return 0.5 * np.cos(2 * np.pi * (cycles / float(period)) - np.pi) + 0.5
+
+def exponential(cycles, tau=PERIOD):
+  """Full push on cycle 1, decaying with time constant tau"""
+
+  return np.minimum(np.exp(-(cycles - 1.) / float(tau)), 1.)
+
+def linear(cycles, start=1., stop=0., length=PERIOD):
+  """A ramp from start on cycle 1 to stop on cycle length"""
+
+  ramp = np.clip((cycles - 1.) / max(float(length) - 1., 1.), 0., 1.)
+
+  return start + (stop - start) * ramp
+
+def restarts(cycles, period=PERIOD, mult=1.):
+  """Half cosines from 1 to 0, restarted every period cycles, with the
+     period multiplied by mult on every restart"""
+
+  cycles = np.asarray(cycles, dtype=float)
+  phase = np.zeros(cycles.shape)
+  length = np.ones(cycles.shape)
+
+  # cycle 1 starts the first period
+  start, span = 1., float(period)
+  while start <= cycles.max():
+    segment = (cycles >= start) & (cycles < start + span)
+    phase[segment] = cycles[segment] - start
+    length[segment] = max(span - 1., 1.)
+    start, span = start + span, span * float(mult)
+
+  return 0.5 * np.cos(np.pi * np.minimum(phase / length, 1.)) + 0.5
+
+def table(cycles, fname):
+  """Fractions read from a file of 'cycle fraction' lines"""
+
+  data = np.loadtxt(fname, ndmin=2)
+  data = data[np.argsort(data[:, 0])]
+
+  # last listed cycle at or before each cycle, the first value before it
+  rows = np.searchsorted(data[:, 0], cycles, side='right') - 1
+
+  return data[np.maximum(rows, 0), 1]
+
+SHAPES = {'cosine': cosine, 'exponential': exponential, 'linear': linear,
+          'restarts': restarts, 'table': table}
+
+#----------#
+# Schedule #
+#----------#
+
+class Schedule:
+  """The push fraction and nearest-neighbor gate of cycles 0 to ncycles"""
+
+  def __init__(self, name=SCHEDULE, ncycles=NCYCLES, **params):
+
+    if name not in SHAPES:
+      raise ValueError('unknown schedule %s, one of %s'
+                       % (name, ', '.join(sorted(SHAPES))))
+
+    self.name = name
+    self.params = params
+    self.cycles = np.arange(ncycles + 1)
+    self.push = np.asarray(SHAPES[name](self.cycles.astype(float), **params),
+                           dtype=float)
+
+    # optimization cycles: the push is not growing
+    self.nn = np.zeros(self.push.shape, dtype=bool)
+    self.nn[1:] = self.push[1:] <= self.push[:-1] + GROWTH
+
+  def __len__(self):
+    return len(self.push)
+
+  def check(self, cycle):
+    """Raises if a cycle is past the end of the table"""
+
+    if not 0 <= cycle < len(self.push):
+      raise IndexError('cycle %s is outside the %s schedule of cycles 0 to %s'
+                       % (cycle, self.name, len(self.push) - 1))
+
+  def fraction(self, cycle):
+    """The fraction of the full push of a cycle"""
+
+    self.check(cycle)
+    return self.push[cycle]
+
+  def calc_nn(self, cycle):
+    """True for the cycles where knots are removed"""
+
+    self.check(cycle)
+    return bool(self.nn[cycle])
+
+def parse_params(args):
+  """{name: value} of 'name=value' arguments, numbers as floats"""
+
+  params = {}
+  for arg in args:
+    key, value = arg.split('=', 1)
+    try:
+      params[key] = float(value)
+    except ValueError:
+      params[key] = value
+
+  return params
+
+#---------#
+# Preview #
+#---------#
+
+def text_chart(schedule, height=10, width=72):
+  """The schedule of cycles 1 to ncycles as lines of text, N on the
+     nearest-neighbor cycles"""
+
+  cycles = schedule.cycles[1:]
+  push = schedule.push[1:]
+
+  # one column per cycle, or the mean of several
+  ncols = min(width, len(cycles))
+  cols = (np.arange(len(cycles)) * ncols) // len(cycles)
+  values = np.bincount(cols, push) / np.bincount(cols)
+  gate = np.bincount(cols, schedule.nn[1:]) > 0
+
+  top = max(values.max(), 1.)
+  level = np.round(values / top * (height - 1)).astype(int)
+
+  lines = []
+  for row in range(height - 1, -1, -1):
+    label = '%6.2f |' % (top * row / (height - 1.))
+    lines.append(label + ''.join(['*' if lvl == row else ' ' for lvl in level]))
+  lines.append('       +' + '-' * ncols)
+  lines.append('     nn ' + ''.join(['N' if g else ' ' for g in gate]))
+  lines.append('  cycle 1%s%s' % (' ' * (ncols - 1 - len(str(cycles[-1]))),
+                                  cycles[-1]))
+
+  return lines
+
+def plot(schedule, fname):
+  """Saves a plot of the schedule, with no display needed"""
+
+  import matplotlib
+  matplotlib.use('Agg')
+  import matplotlib.pyplot as plt
+
+  cycles = schedule.cycles[1:]
+  push = schedule.push[1:]
+  nn = schedule.nn[1:]
+
+  plt.plot(cycles, push, '--')
+  plt.scatter(cycles[~nn], push[~nn], label='push')
+  plt.scatter(cycles[nn], push[nn], label='push + nearest neighbors')
+  plt.xlabel('Cycles')
+  plt.ylabel('Simulated Annealing Push')
+  plt.title('%s %s' % (schedule.name, ' '.join(['%s=%s' % item for item in
+                                                sorted(schedule.params.items())])))
+  plt.legend()
+  plt.savefig(fname)
+  plt.close()
+
+#--------#
+#  MAIN  #
+#--------#
+
+if __name__ == '__main__':
+
+  name    = sys.argv[1]
+  ncycles = int(sys.argv[2])
+  args    = sys.argv[3:]
+
+  png = None
+  if args and '=' not in args[-1]:
+    png = args.pop()
+
+  schedule = Schedule(name, ncycles, **parse_params(args))
+  print('\n'.join(text_chart(schedule)))
+  if png is not None:
+    plot(schedule, png)
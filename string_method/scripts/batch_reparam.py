@@ -0,0 +1,72 @@
+#!/usr/bin/python
+
+""" batch_reparam.py: Reparametrizes every string of a run in one call
+
+      Usage: python batch_reparam.py <nvar> <nimg> <in_dir> <out_dir> [prefix] [periodic]
+
+      Description: Loads all <prefix><cycle>.dat files of a run (default
+                   prefix string_unparam_) and reparametrizes them together
+                   as (ncycles, nimages, nvars) arrays, instead of running
+                   string_reparam.py once per cycle. Strings are grouped by
+                   their number of images so each group is a single batch.
+
+                   As in string_reparam.py, every string is made continuous
+                   across the +-180 seam of the periodic col vars before it
+                   is reparametrized (see pbc.py).
+
+      Input: nvar - the number of collective variables
+             nimg - the number of images in the reparametrized strings
+             in_dir - the directory holding the <prefix><cycle>.dat files
+             out_dir - where to write the results, must differ from in_dir
+             prefix - the file name prefix of the strings to reparametrize
+             periodic - one 0/1 flag per col var, e.g. 11 for phi,psi
+                        (default: the angle vars of pbc.py)
+
+      Output: out_dir/string_<cycle>.dat - the reparametrized strings
+                                                                         """
+import os, sys
+import numpy as np
+import pbc, reparam, string_io
+
+#----------------#
+# Initialization #
+#----------------#
+
+nvar    = int(sys.argv[1])
+nimg    = int(sys.argv[2])
+in_dir  = sys.argv[3]
+out_dir = sys.argv[4]
+prefix  = 'string_unparam_'
+if len(sys.argv) > 5:
+  prefix = sys.argv[5]
+periodic = pbc.angle_masks(nvar)[0]
+if len(sys.argv) > 6:
+  periodic = [flag == '1' for flag in sys.argv[6]]
+
+# Never overwrite the string_<cycle>.dat files of the run itself
+if os.path.abspath(in_dir) == os.path.abspath(out_dir):
+  sys.exit('batch_reparam.py: out_dir must differ from in_dir')
+if not os.path.isdir(out_dir):
+  os.makedirs(out_dir)
+
+cycles, strings = string_io.read_run(in_dir, nvar, prefix)
+
+#---------------------------#
+# Reparametrize the strings #
+#---------------------------#
+
+# Strings trimmed by the nearest-neighbor step may have fewer images
+groups = {}
+for cycle, string in zip(cycles, strings):
+  groups.setdefault(string.shape[0], []).append(cycle)
+
+by_cycle = dict(zip(cycles, strings))
+for nimg_old in groups:
+  group = groups[nimg_old]
+  stack = pbc.unwrap(np.array([by_cycle[cycle] for cycle in group]), periodic)
+  new_strings = reparam.reparametrize_batch(stack, nimg)
+  new_strings = reparam.fold_unsigned(new_strings)
+
+  for cycle, new_string in zip(group, new_strings):
+    string_io.write_string(os.path.join(out_dir, 'string_%s.dat' % cycle),
+                           new_string)
@@ -13,9 +13,14 @@ python gen-bsub-cyc.py $start_cyc $end_cyc
 # Submit each cycle
 for (( cyc = $start_cyc; cyc <= end_cyc; cyc++ )); do
 
-  for i in {1..37}; do
+  # Only the images of this cycle, their number may change between
+  # cycles (see refine in gen-bsub-cyc.py)
+  nimg=$(ls as.*.$cyc.sh | wc -l)
 
-    # Uncomment for single machine usage:
+  for (( i = 1; i <= nimg; i++ )); do
+
+    # Uncomment for single machine usage (one image at a time,
+    # local-cyc.py runs them on all cores):
     sh as.$i.$cyc.sh
     echo "IMAGE $i CYCLE $cyc FINISHED" >> as.$i.$cyc.o
 
@@ -25,19 +30,12 @@ for (( cyc = $start_cyc; cyc <= end_cyc; cyc++ )); do
 
   echo 'RUNNING ... CYCLE = '$cyc
 
-  # Wait until current cycle finishes
-  while true; do
-    if [ -e 'string_'$cyc'.dat' ]; then
-      sleep 1s
-      echo 'CYCLE = '$cyc' COMPLETED'
-      break
-    else
-      sleep 60s
-    fi
-  done
+  # Wait until current cycle finishes, see file_events.py
+  python file_events.py 'string_'$cyc'.dat'
+  echo 'CYCLE = '$cyc' COMPLETED'
 
   # Clean up
-  for i in {1..37}; do
+  for (( i = 1; i <= nimg; i++ )); do
     mv as.$i.$cyc.sh 0log/
     mv as.$i.$cyc.o 0log/
 
@@ -0,0 +1,103 @@
+#!/usr/bin/python
+
+""" charmm_job.py: Run the CHARMM job of one image of the string method
+
+      Usage: import charmm_job
+             charmm_job.run_image(image, cycle)
+             charmm_job.run_image(image, cycle, ntraj=ntraj)
+
+      Description: Runs run_string.inp for an image with random seeds for
+                   the initial conditions of the trajectories, and re-runs it
+                   with new seeds while the output reports an ABNORMAL
+                   termination. The seeds of every attempt derive from the
+                   root seed of the run, see seeds.py, so a cycle can be
+                   re-run with the same seeds. Used by manage_image.py,
+                   manage_image_last.py and local-cyc.py.
+
+                   With SURROGATE set to a PMF file, or STRING_SURROGATE in
+                   the environment, the image is run by the overdamped
+                   Langevin surrogate of langevin_surrogate.py instead, with
+                   ntraj trajectories (default NTRAJ of the surrogate) and
+                   a random stream from the same root seed. It reads and
+                   writes the files of run_string.inp, .cor files included,
+                   and leaves a NORMAL TERMINATION output, so the rest of
+                   the cycle does not tell the two apart.
+
+                   See run_string.inp for more details.
+                                                                         """
+
+import os
+import langevin_surrogate, pmf_surface, seeds
+
+CHARMM = 'c36b1_large'
+TAIL   = 5000   # bytes at the end of the output checked for ABNORMAL
+
+SURROGATE     = None   # PMF file to run langevin_surrogate.py instead
+SURROGATE_ENV = 'STRING_SURROGATE'
+
+#------------------#
+# Helper Functions #
+#------------------#
+
+def abnormal(outfile):
+  """True if the end of a CHARMM output reports an ABNORMAL termination"""
+
+  output = open(outfile, 'rb')
+  output.seek(0, 2)
+  output.seek(max(output.tell() - TAIL, 0))  # Go to TAIL bytes from the end
+  outtail = output.read()
+  output.close()
+
+  return outtail.find(b'ABNORMAL') != -1
+
+def surrogate():
+  """The PMF file of the surrogate backend, None to run CHARMM"""
+
+  return os.environ.get(SURROGATE_ENV, SURROGATE)
+
+#------------#
+# CHARMM job #
+#------------#
+
+def run_surrogate(image, cycle, root, ntraj=None, pmf_file=None):
+  """Runs an image with the Langevin surrogate, returns 1 attempt"""
+
+  if ntraj is None:
+    ntraj = langevin_surrogate.NTRAJ
+
+  rng = seeds.random_state(root, 'surrogate', cycle, image)
+  langevin_surrogate.run_images(pmf_surface.read_pmf(pmf_file), [image],
+                                cycle, ntraj, rng)
+
+  output = open('img_%s_cycle_%s.out' % (image, cycle), 'w')
+  output.write(' LANGEVIN SURROGATE ON %s, %s TRAJECTORIES\n' % (pmf_file, ntraj))
+  output.write(' NORMAL TERMINATION BY NORMAL STOP\n')
+  output.close()
+
+  return 1
+
+def run_image(image, cycle, root=None, ntraj=None):
+  """Runs the CHARMM job of an image, returns the number of attempts
+
+     ntraj is only used by the surrogate, the CHARMM job runs the swarms of
+     run_string.inp."""
+
+  if root is None:
+    root = seeds.root_seed()
+
+  if surrogate():
+    return run_surrogate(image, cycle, root, ntraj, surrogate())
+
+  outfile = 'img_%s_cycle_%s.out' % (image, cycle)
+  attempts = 0
+
+  while 1: # Re-run if ABNORMAL termination
+
+    isee1, isee2, isee3, isee4 = seeds.charmm_seeds(root, cycle, image, attempts)
+
+    os.system('%s cycle=%s image=%s isee1=%s isee2=%s isee3=%s isee4=%s < run_string.inp > %s' % \
+             (CHARMM, cycle, image, isee1, isee2, isee3, isee4, outfile))
+    attempts += 1
+
+    if not abnormal(outfile):
+      return attempts
@@ -3,89 +3,310 @@
 """ compute_string.py: A simple program to compute the unparametrized string
                        values for each image
 
-      Usage: python compute_string.py <nvars> <nimg> <cycle> <ntraj>
+      Usage: python compute_string.py <nvars> <nimg> <cycle> <ntraj> [stream] [periodic]
 
-      Description:
-      
-      Input:
+      Description: Averages the swarm of trajectories of every image. The
+                   .swm files of an image are read in one pass and parsed
+                   together into an (ntraj, nvars) array, and the swarms of
+                   all images are averaged at once.
 
-      Output: string_unparam_<cycle>.dat 
+                   Periodic col vars (dihedrals, in degrees) get the circular
+                   mean, the direction of the mean of the unit vectors
+                   (cos, sin) of the swarm, and the circular variance 1 - R,
+                   with R the length of that mean vector. A swarm straddling
+                   +-180 then averages to a point near the seam instead of
+                   near 0. The other col vars get the arithmetic mean and
+                   variance. The periodic mask defaults to the angle col vars
+                   of pbc.py.
+
+                   With stream set to 1, the script can be started while the
+                   swarms are still running: each .swm file is added to a
+                   running mean as soon as it is complete (see
+                   file_events.py), so the string is ready once the last
+                   trajectory finishes.
+
+      Input: nvars - the number of col vars
+             nimg - the number of images
+             cycle - the iteration of the string method
+             ntraj - the number of trajectories in the swarm
+             stream - 1 to average the swarms as they are written
+             periodic - one 0/1 flag per col var, e.g. 11 for phi,psi
+
+             img_<img>_cycle_<cycle>.swm<traj> - the swarms of trajectories
+               or swarm_<cycle>.bin and its swarm_<cycle>.img<img>.bin
+               shards - the same swarms packed, see swarm_store.py
+             img_<img>_cycle_1.var - the col vars of the fixed images
+
+      Output: string_unparam_<cycle>.dat
                                                                             """
 
 import numpy as np
 import os, sys
+import file_events, pbc, string_io, swarm_store
+
+RAD = np.pi / 180.
 
 #------------------#
 # Helper Functions #
 #------------------#
 
-def compute_strimg(sdata, nvars):  
-  """Computes the average of the swarm of trajectories from a flattened array"""
+def periodic_mask(nvars, periodic=None):
+  """Returns the periodic col vars as a boolean mask"""
+
+  if periodic is None:
+    return pbc.angle_masks(nvars)[0]
+
+  return np.asarray(periodic, dtype=bool)
+
+def circular_mean(sins, coss):
+  """Circular mean in degrees and circular variance from mean sin, cos"""
 
-  ntraj = sdata.size / nvars
-  swarm = np.reshape(sdata, (nvars, ntraj), order='F') # Reshape column major
-  strimg = np.zeros(nvars)
+  mean = np.degrees(np.arctan2(sins, coss))
+  var = 1. - np.sqrt(sins**2 + coss**2)
+
+  return mean, var
+
+def swarm_stats(swarms, periodic):
+  """Means and variances over the trajectories of (..., ntraj, nvars) swarms
+
+     Periodic col vars get the circular mean and variance."""
+
+  ntraj, nvars = swarms.shape[-2:]
+  mean = np.zeros(swarms.shape[:-2] + (nvars,))
+  var = np.zeros(mean.shape)
 
   for i in range(nvars):
-   
-    # Compute Arithmetic Mean:
-    strimg[i] = np.sum(swarm[i,:]) / ntraj
 
-  return strimg
+    if periodic[i]:
+      # Compute Circular Mean:
+      rad = swarms[..., i] * RAD
+      mean[..., i], var[..., i] = circular_mean(np.sin(rad).mean(axis=-1),
+                                                np.cos(rad).mean(axis=-1))
+    else:
+      # Compute Arithmetic Mean:
+      mean[..., i] = np.sum(swarms[..., i], axis=-1) / ntraj
+      var[..., i] = swarms[..., i].var(axis=-1)
+
+  return mean, var
 
 def get_colvars(imgfile):
   """Gives a flattened array of col vars"""
-  
-  image_array = np.loadtxt(imgfile)
-  return image_array.flatten() 
-   
-def get_swarm(img, cycle, nvars, ntraj):
-  """Appends col vars in each trajectory to a swarm array"""
 
-  # Preallocate memory
-  swarm = np.zeros(ntraj *nvars)  
+  return string_io.read_var(imgfile)
+
+def read_file(fname):
+  """Returns the bytes of a small file, with plain system calls"""
+
+  fd = os.open(fname, os.O_RDONLY)
+  chunks = []
+  while 1:
+    chunk = os.read(fd, 65536)
+    if not chunk:
+      break
+    chunks.append(chunk)
+  os.close(fd)
 
-  for traj in range(ntraj):
+  return b''.join(chunks)
 
-    imgfile = open('img_%s_cycle_%s.swm%s' %(img, cycle, traj), 'r')
-    colvars = get_colvars(imgfile)
- 
-    start = traj * nvars 
-    end   = (traj + 1) * nvars 
+def swarm_file(img, cycle, traj):
+  """Returns the name of the .swm file of a trajectory"""
 
-    swarm[start:end] = colvars
+  return 'img_%s_cycle_%s.swm%s' %(img, cycle, traj)
+
+def get_swarm(img, cycle, nvars, ntraj, store=None):
+  """Reads the swarm of an image into an (ntraj, nvars) array
+
+     From the swarm store if it holds the image, else from the .swm files."""
+
+  if store is not None and (img, 0) in store.index:
+    return store.swarm(img, ntraj)
+
+  # Batch the reads, then a single parse of all the trajectories
+  text = b'\n'.join([read_file(swarm_file(img, cycle, traj))
+                     for traj in range(ntraj)])
+
+  swarm = string_io.parse_string(text.decode(), nvars,
+                                 swarm_file(img, cycle, '*'))
+  if swarm.shape[0] != ntraj:
+    raise ValueError('%s: %s trajectories instead of %s'
+                     % (swarm_file(img, cycle, '*'), swarm.shape[0], ntraj))
 
   return swarm
-  
+
+def get_swarms(nvars, nimg, cycle, ntraj):
+  """The swarms of all evolved images at once, (nimg-2, ntraj, nvars)"""
+
+  store = swarm_store.open_cycle(cycle)
+
+  return np.array([get_swarm(img, cycle, nvars, ntraj, store)
+                   for img in range(1, nimg-1)])
+
+def get_stats(nvars, nimg, cycle, ntraj, periodic=None, swarms=None):
+  """Swarm means and variances of every image, (nimg, nvars) each
+
+     swarms are those of get_swarms if they were read already."""
+
+  periodic = periodic_mask(nvars, periodic)
+  if swarms is None:
+    swarms = get_swarms(nvars, nimg, cycle, ntraj)
+  mean = np.zeros((nimg, nvars))
+  var = np.zeros((nimg, nvars))
+  mean[1:-1], var[1:-1] = swarm_stats(swarms, periodic)
+
+  # Fixed images, ntraj = 1 and the swarm is the initial .var
+  for img in (0, nimg-1):
+    mean[img] = get_colvars('img_%s_cycle_1.var' %img)
+
+  #  DEBUGGING:
+  #  print "=============== SWARMS ==============="
+  #  print swarms
+  #  print "============ String Images ==========="
+  #  print mean
+
+  return mean, var
+
+def get_string(nvars, nimg, cycle, ntraj, periodic=None, swarms=None):
+  """Averages the swarm of every image into an (nimg, nvars) string"""
+
+  return get_stats(nvars, nimg, cycle, ntraj, periodic, swarms)[0]
+
+#-----------#
+# Streaming #
+#-----------#
+
+class SwarmStream:
+  """Running means of the swarms of a cycle, updated as .swm files land"""
+
+  def __init__(self, nvars, nimg, cycle, ntraj, periodic=None):
+
+    self.nvars    = nvars
+    self.periodic = periodic_mask(nvars, periodic)
+    self.sums     = np.zeros((nimg, nvars))
+    self.squares  = np.zeros((nimg, nvars))
+    self.sins     = np.zeros((nimg, nvars))
+    self.coss     = np.zeros((nimg, nvars))
+    self.counts   = np.zeros(nimg, dtype=int)
+
+    # .swm file -> (image, traj), for the trajectories still running
+    self.cycle = cycle
+    self.pending = {}
+    for img in range(1, nimg-1):
+      for traj in range(ntraj):
+        self.pending[swarm_file(img, cycle, traj)] = (img, traj)
+
+    # Fixed images, the swarm is the initial .var
+    self.fixed = {}
+    for img in (0, nimg-1):
+      self.fixed[img] = get_colvars('img_%s_cycle_1.var' %img)
+
+  def add(self, img, colvars):
+    """Adds the col vars of one trajectory to the mean of its image"""
+
+    self.sums[img] += colvars
+    self.squares[img] += colvars**2
+    self.sins[img] += np.sin(colvars * RAD)
+    self.coss[img] += np.cos(colvars * RAD)
+    self.counts[img] += 1
+
+  def read(self, fname):
+    """Returns the col vars of a complete .swm file, None if not yet"""
+
+    if not os.path.exists(fname):
+      return None
+
+    text = read_file(fname).decode()
+
+    # all nvars lines written
+    if not text.endswith('\n'):
+      return None
+    colvars = string_io.parse_values(string_io.HEADER.sub(' ', text), fname)
+    if colvars.size != self.nvars:
+      return None
+
+    return colvars
+
+  def update(self, names=None):
+    """Adds the finished trajectories, only those in names if given"""
+
+    for fname in list(self.pending):
+      if names is not None and fname not in names:
+        continue
+      colvars = self.read(fname)
+      if colvars is not None:
+        self.add(self.pending.pop(fname)[0], colvars)
+
+    # Images whose .swm files were already packed into a shard or the store
+    if names is None or [name for name in names
+                         if swarm_store.is_store_file(name, self.cycle)]:
+      store = swarm_store.open_cycle(self.cycle)
+      if store is not None:
+        for fname in list(self.pending):
+          if self.pending[fname] in store.index:
+            img, traj = self.pending.pop(fname)
+            self.add(img, store.row(img, traj))
+
+  def stats(self):
+    """The (nimg, nvars) swarm means and variances so far"""
+
+    # the fixed images have no trajectories
+    counts = np.maximum(self.counts, 1)[:, np.newaxis]
+    mean = self.sums / counts
+    var = self.squares / counts - mean**2
+    circ, circ_var = circular_mean(self.sins / counts, self.coss / counts)
+    mean = np.where(self.periodic, circ, mean)
+    var = np.where(self.periodic, circ_var, var)
+
+    for img in self.fixed:
+      mean[img] = self.fixed[img]
+      var[img] = 0.
+
+    return mean, var
+
+  def mean(self):
+    """The (nimg, nvars) string of the swarm averages so far"""
+
+    return self.stats()[0]
+
+def stream_string(nvars, nimg, cycle, ntraj, periodic=None,
+                  poll=file_events.POLL):
+  """Averages the swarms as their files are written, returns the string"""
+
+  # Watch before the first check, so no file can land in between
+  watcher = file_events.Watcher([os.getcwd()], poll)
+  stream = SwarmStream(nvars, nimg, cycle, ntraj, periodic)
+
+  try:
+    stream.update()
+    while stream.pending:
+      stream.update(watcher.wait(poll))
+  finally:
+    watcher.close()
+
+  return stream.mean()
+
 #--------#
 #  MAIN  #
 #--------#
 
-nvars = int(sys.argv[1])
-nimg  = int(sys.argv[2])
-cycle = int(sys.argv[3])
-ntraj = int(sys.argv[4])
+if __name__ == '__main__':
 
-output = open('string_unparam_%s.dat' %cycle, 'w')
+  nvars = int(sys.argv[1])
+  nimg  = int(sys.argv[2])
+  cycle = int(sys.argv[3])
+  ntraj = int(sys.argv[4])
+  stream = len(sys.argv) > 5 and bool(int(sys.argv[5]))
+  periodic = None
+  if len(sys.argv) > 6:
+    periodic = [flag == '1' for flag in sys.argv[6]]
 
-for img in range(nimg):
+  if stream:
+    string = stream_string(nvars, nimg, cycle, ntraj, periodic)
+  else:
+    string = get_string(nvars, nimg, cycle, ntraj, periodic)
 
-  # Fixed images, set ntraj = 1 and copy over swarm from initial .var
-  if img == 0 or img == (nimg-1):
+  # Keep a copy of the fixed images' swarm with the others
+  for img in (0, nimg-1):
     os.system('cp img_%s_cycle_1.var img_%s_cycle_%s.swm0' %(img, img, cycle))
-    swarm = get_swarm(img, cycle, nvars, 1)
-  else: 
-    swarm = get_swarm(img, cycle, nvars, ntraj)
-    
-  strimg = compute_strimg(swarm, nvars)
-
-#  DEBUGGING:
-#  print "=============== SWARM %s ===============" %i
-#  print np.reshape(swarm, (nvars,10), order = 'F')
-#  print "============ String Image %s ===========" %i
-#  print strimg
 
   # Write out the string:
-  output.write('# Image %s\n' %img)  # Header
-  for j in strimg:
-    output.write('%s\n' %j)
+  string_io.write_string('string_unparam_%s.dat' %cycle, string)
@@ -0,0 +1,195 @@
+#!/usr/bin/python
+
+""" file_events.py: Wait for the files of a string method cycle to appear
+
+      Usage: python file_events.py <file> [<file> ...]
+
+      Description: Blocks until every file given exists, instead of sleeping
+                   a fixed time between checks. On Linux the directories of
+                   the files are watched with inotify (through ctypes), so a
+                   waiter wakes up as soon as a file is created or renamed
+                   into place. Elsewhere, or if inotify is not available, the
+                   files are polled.
+
+                   inotify only sees changes made on this machine, so on a
+                   network file system shared by cluster nodes every pending
+                   file is still re-checked every POLL seconds, whether
+                   events arrived in between or not.
+
+                   Files that are waited on must appear complete: they are
+                   written under a temporary name and renamed into place
+                   (atomic on POSIX), see mark_done and publish. The image
+                   jobs leave an img_<img>_cycle_<cycle>.done marker when
+                   their CHARMM run finished normally.
+
+      Input: file - the files to wait for
+
+      Output: None, returns once all files exist
+                                                                         """
+
+import ctypes, ctypes.util, errno, os, select, struct, sys, time
+
+POLL = 5.0   # seconds between checks without inotify events
+
+# inotify events: a file closed after writing, renamed in, or created
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO    = 0x00000080
+IN_CREATE      = 0x00000100
+IN_EVENTS      = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+IN_Q_OVERFLOW  = 0x00004000
+
+EVENT = 'iIII'   # wd, mask, cookie, len, followed by the file name
+
+#------------------#
+# Helper Functions #
+#------------------#
+
+def _libc():
+  """Returns libc if it has inotify, else None"""
+
+  if not sys.platform.startswith('linux'):
+    return None
+
+  try:
+    libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6',
+                       use_errno=True)
+    libc.inotify_init
+  except (OSError, AttributeError):
+    return None
+
+  return libc
+
+def publish(tmp, fname):
+  """Renames a fully written file into place, waiters never see it partial"""
+
+  os.rename(tmp, fname)
+
+def mark_done(fname, text=''):
+  """Atomically creates a marker file"""
+
+  tmp = '%s.%s.tmp' % (fname, os.getpid())
+  marker = open(tmp, 'w')
+  marker.write(text)
+  marker.close()
+
+  publish(tmp, fname)
+
+#----------#
+# Watching #
+#----------#
+
+class Watcher:
+  """inotify watches on a set of directories
+
+     Falls back to doing nothing (the caller polls) if inotify can not be
+     set up. Asks for a full re-check at least every poll seconds."""
+
+  def __init__(self, dirs, poll=POLL):
+
+    self.fd = -1
+    self.poll = poll
+    self.scanned = time.time()
+    libc = _libc()
+    if libc is None:
+      return
+
+    fd = libc.inotify_init()
+    if fd < 0:
+      return
+
+    for dname in dirs:
+      if libc.inotify_add_watch(fd, dname.encode(), IN_EVENTS) < 0:
+        os.close(fd)
+        return
+
+    self.fd = fd
+
+  def wait(self, timeout):
+    """Waits up to timeout seconds for events
+
+       Returns the set of file names seen, or None if everything has to be
+       re-checked (timeout, no inotify, lost events or poll seconds since
+       the last full re-check)."""
+
+    timeout = max(0., min(timeout, self.poll - (time.time() - self.scanned)))
+    if self.fd < 0:
+      time.sleep(timeout)
+      return self.rescan()
+
+    try:
+      ready = select.select([self.fd], [], [], timeout)[0]
+    except select.error as err:
+      if err.args[0] == errno.EINTR:
+        return self.rescan()
+      raise
+    if not ready:
+      return self.rescan()
+
+    data = os.read(self.fd, 65536)
+    names = set()
+    size = struct.calcsize(EVENT)
+    pos = 0
+    while pos + size <= len(data):
+      mask, nlen = struct.unpack(EVENT, data[pos:pos + size])[1::2]
+      if mask & IN_Q_OVERFLOW:
+        return self.rescan()
+      name = data[pos + size:pos + size + nlen].split(b'\0', 1)[0]
+      names.add(name.decode())
+      pos += size + nlen
+
+    # files written from other nodes raise no events here
+    if time.time() - self.scanned >= self.poll:
+      return self.rescan()
+
+    return names
+
+  def rescan(self):
+    """Notes a full re-check, returns None to ask for it"""
+
+    self.scanned = time.time()
+    return None
+
+  def close(self):
+    if self.fd >= 0:
+      os.close(self.fd)
+      self.fd = -1
+
+def wait_for(fnames, timeout=None, poll=POLL):
+  """Blocks until all files exist; False if timeout seconds pass first"""
+
+  pending = set([os.path.abspath(fname) for fname in fnames])
+  dirs = set([os.path.dirname(fname) for fname in pending])
+
+  # Watch before the first check, so no file can land in between
+  watcher = Watcher(dirs, poll)
+  start = time.time()
+
+  try:
+    pending = set([fname for fname in pending if not os.path.exists(fname)])
+    while pending:
+
+      wait = poll
+      if timeout is not None:
+        left = timeout - (time.time() - start)
+        if left <= 0:
+          return False
+        wait = min(wait, left)
+
+      # Only the files named in the events need a check, unless it is
+      # time for a full one
+      names = watcher.wait(wait)
+      pending = set([fname for fname in pending
+                     if (names is not None and os.path.basename(fname) not in names)
+                     or not os.path.exists(fname)])
+
+    return True
+  finally:
+    watcher.close()
+
+#--------#
+#  MAIN  #
+#--------#
+
+if __name__ == '__main__':
+
+  wait_for(sys.argv[1:])
@@ -5,14 +5,21 @@
 
      Usage: python gen-bsub-cyc.py <startcycle> <endcycle>
   
-     Description: - 
+     Description: One script per evolved image of every cycle. With a
+                  refine table the number of images changes from the cycles
+                  listed on: a cycle only gets the scripts of its images,
+                  and its last image tells manage_image_last.py the number
+                  of images of the next cycle (see string_cycle.py).
 
      Input: startcycle - the starting iteration
             endcycle - the last iteration      
           
      Output: as.<image>.<cycle>.sh - the submission script.
+             root_seed.dat - the root seed of the run, if not there yet,
+                             see seeds.py
                                                                             """
 import os, re, random, sys
+import seeds, string_cycle
 
 #-------------------#
 # Initial Variables #
@@ -23,6 +30,7 @@ endcycle   = int(sys.argv[2])
 
 nvars   = 2  # number of collective variables
 nimages = 39  # number of images in string
+refine  = {}  # {first cycle: nimages}, e.g. {30: 51, 60: 63}
 ntraj   = 100
 
 #----------------------------------#
@@ -30,10 +38,15 @@ ntraj   = 100
 #----------------------------------#
 
 for cycle in range(startcycle, endcycle+1):
-  for image in range(1, nimages-1): 
+
+  # the images of this cycle and of the next one
+  count = string_cycle.image_count(cycle, nimages, refine)
+  new_count = string_cycle.image_count(cycle+1, nimages, refine)
+
+  for image in range(1, count-1): 
 
     # Evolved images(1-40) excluding last
-    if image != (nimages-2):
+    if image != (count-2):
       output = open('as.%s.%s.sh' % (image, cycle), 'w')
       output.write("""\
 #!/bin/sh
@@ -43,8 +56,8 @@ for cycle in range(startcycle, endcycle+1):
 #BSUB-J as.%s.%s         # name of the job
 #BSUB-o as.%s.%s.o       # LSF output file
 
-./manage_image.py %s %s %s   #(img, cycle, nvars)
-""" % (image, cycle, image, cycle, image, cycle, nvars)) 
+./manage_image.py %s %s %s %s   #(img, cycle, nvars, ntraj)
+""" % (image, cycle, image, cycle, image, cycle, nvars, ntraj))
       output.close()
 
     # Last evolved image 41
@@ -58,8 +71,11 @@ for cycle in range(startcycle, endcycle+1):
 #BSUB-J as.%s.%s         # name of the job
 #BSUB-o as.%s.%s.o       # LSF output file
 
-./manage_image_last.py %s %s %s %s %s   #(img, cycle, nvars, nimgs, ntraj)
-""" % (image, cycle, image, cycle, image, cycle, nvars, nimages, ntraj))
+./manage_image_last.py %s %s %s %s %s %s   #(img, cycle, nvars, nimgs, ntraj, new_nimgs)
+""" % (image, cycle, image, cycle, image, cycle, nvars, count, ntraj, new_count))
       output.close()
 
 os.system('chmod +x *.sh')
+
+# every job of the run derives its seeds from the same root
+seeds.root_seed()
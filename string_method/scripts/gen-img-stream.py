@@ -11,7 +11,9 @@
 
                    See run_string.inp for more details.
 
-      Input: nimgs - the number of images
+      Input: nimgs - the number of images, the images of string_<cycle>.dat
+                     are used if it holds another number (see
+                     string_cycle.image_count)
              nvars - the number of collective variables
              cycle - the iteration cycle of the string method
   
@@ -21,6 +23,7 @@
                    
                                                                          """
 import os, sys
+import string_io
 
 #----------------#
 # Initialization #
@@ -30,7 +33,10 @@ nimgs = int(sys.argv[1])
 nvars = int(sys.argv[2])
 cycle = int(sys.argv[3])
 
-string = open('string_%s.dat' %cycle).readlines()
+string = string_io.read_string('string_%s.dat' %cycle, nvars)
+
+# the string may have been refined to another number of images
+nimgs = len(string)
 
 #----------------------------#
 # Generate the stream files  #
@@ -40,34 +46,5 @@ for img in range(nimgs):
 
   # Make stream files only for evolved images:1-41
   if img != 0 and img != (nimgs-1):
-    outfile = open('img_%s_cycle_%s.str' %(img, cycle), 'w')
-
-    for coors in range(nvars/2):
-
-      # Indices of the Collective Variables in the string
-      phiInd = nvars * img + (img + 1) + 2 * coors
-      psiInd = nvars * img + (img + 1) + 2 * coors + 1
-    
-      # Get the coor and resid values 
-      phiVal = string[phiInd].strip()
-      psiVal = string[psiInd].strip()
-
-      # Write out PHI/PSI restraints
-      outfile.write("""\
-mmfp
-geo sphere dihedral - 
-  harmonic symmetric force 200.0 tref %s dtoff 0.0 - 
-  select type CLP end   select type NL  end -
-  select type CA  end   select type CRP end
-end
-
-mmfp
-geo sphere dihedral - 
-  harmonic symmetric force 200.0 tref %s dtoff 0.0 - 
-  select type NL  end   select type CA  end -
-  select type CRP end   select type NR  end
-end
-
-""" %(phiVal, psiVal))
- 
-    outfile.close()
+    # PHI/PSI restraints, see string_io.STREAM
+    string_io.write_stream('img_%s_cycle_%s.str' %(img, cycle), string[img])
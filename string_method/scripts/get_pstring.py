@@ -8,40 +8,33 @@
 
 import numpy as np
 import os, sys
+import string_io
 
 #------------------#
 # Helper Functions #
-#------------------# 
+#------------------#
+
+def get_pstring(nimgs, cycle):
+  """Collects the pushed col vars of every image into an (nimgs, nvars) array"""
+
+  images = []
 
-def write_img(img_file, string_file, image):
-  
-  string_file.write('# Image %s\n' %image)
+  for image in range(nimgs):
 
-  for line in img_file:
-    line = line.split()
-    try:
-      # Write the CV to the string file
-      string_file.write('%s\n' %line[0])
+    if image == 0 or image == (nimgs-1):
+      images.append(string_io.read_var('img_%s_cycle_1.var' % image))
+    else:
+      images.append(string_io.read_var('img_%s_cycle_%s_pushed.var' %(image, cycle)))
 
-    except IndexError:
-      pass        # Do nothing, probably header info.
+  return np.array(images)
 
 #------#
 # Main #
 #------#
 
-nimgs = int(sys.argv[1])
-cycle = int(sys.argv[2])
-
-stringfile = open('string_pushed_%s.dat' % cycle, 'w')
-
-for image in range(nimgs):
+if __name__ == '__main__':
 
-  if image == 0 or image == (nimgs-1):
-    imgfile = open('img_%s_cycle_1.var' % image, 'r')
-  else:
-    imgfile = open('img_%s_cycle_%s_pushed.var' %(image, cycle), 'r')
-  write_img(imgfile, stringfile, image)
-  imgfile.close()
+  nimgs = int(sys.argv[1])
+  cycle = int(sys.argv[2])
 
-stringfile.close()
+  string_io.write_string('string_pushed_%s.dat' % cycle, get_pstring(nimgs, cycle))
@@ -0,0 +1,169 @@
+#!/usr/bin/python
+
+""" knot_detector.py: Finds the tangled spans of a string
+
+      Usage: import knot_detector
+             report = knot_detector.detect(string, knots='shortest')
+             report['spans']     # [(first, last), ...] tangled images
+
+             python knot_detector.py <string.dat> <nvars> [knots]
+
+      Description: An image of a clean string is closer to its chain
+                   neighbors (the images before and after it) than to any
+                   other image. Image ii is tangled with image jj,
+                   |ii - jj| > 1, when jj is closer to ii than the further
+                   of its chain neighbors; the images ii to jj are then a
+                   tangled span. Overlapping spans are merged.
+
+                   The 3 nearest images of every image are enough: when
+                   all 3 are closer than the chain neighbors, one of them is
+                   not a chain neighbor. They come from one query of a
+                   NeighborIndex (see neighbor_index.py) for the whole
+                   string, with the minimum image for the periodic col vars.
+
+                   No tangled span means the nearest-neighbor walks of
+                   nearest_neighbors.py (inc_num and no_revisit) step
+                   through every image in order, so string_cycle.py skips
+                   the knot removal and its reparametrization for a clean
+                   string.
+
+                   The shortest path walk cuts across bends as well: its
+                   squared-length cost makes the shortcut i -> i+2 cheaper
+                   than the two links whenever the angle between them at
+                   image i+1 is under 90 degrees, though both neighbors are
+                   still its nearest images. For knots='shortest' a span (i, j) is tangled
+                   when an edge of its graph, one of the KNN nearest
+                   images, costs less than the links from i to j: the
+                   string in order is the least cost path exactly when no
+                   edge does, so the check agrees with the walk.
+
+                   The report holds the spans, the number of images in
+                   them and the time the detection took.
+
+      Input: string.dat - a string file
+             nvars - the number of col vars
+             knots - the walk of the knot removal, one of
+                     nearest_neighbors.WALKS (default inc_num)
+
+      Output: The report of the string
+                                                                         """
+
+import sys, time
+import numpy as np
+import nearest_neighbors, neighbor_index, string_io
+
+NEIGHBORS = 3   # nearest images checked for every image
+
+#------------------#
+# Helper Functions #
+#------------------#
+
+def merge_spans(pairs):
+  """Merges (first, last) pairs into sorted, non-overlapping spans"""
+
+  spans = []
+  for first, last in sorted(pairs):
+    if spans and first <= spans[-1][1]:
+      spans[-1] = (spans[-1][0], max(spans[-1][1], last))
+    else:
+      spans.append((first, last))
+
+  return spans
+
+def span_images(spans):
+  """The number of images in the spans"""
+
+  return sum([last - first + 1 for first, last in spans])
+
+#-----------#
+# Detection #
+#-----------#
+
+def tangled_pairs(string, periodic=None):
+  """(image, image) pairs closer than their chain neighbors"""
+
+  string = np.asarray(string, dtype=float)
+  nimages = string.shape[0]
+  if nimages < 3:
+    return []
+
+  index = neighbor_index.NeighborIndex(string, periodic)
+  dist, nbrs = index.knn(min(NEIGHBORS, nimages - 1))
+
+  # the further chain neighbor of every image, the ends have one
+  links = index.distances(np.arange(nimages - 1), np.arange(1, nimages))
+  chain = np.zeros(nimages)
+  chain[:-1] = links
+  chain[1:] = np.maximum(chain[1:], links)
+
+  images = np.arange(nimages)[:, np.newaxis]
+  tangled = (np.abs(nbrs - images) > 1) & (nbrs < nimages) & \
+            (dist < chain[:, np.newaxis])
+
+  rows, cols = np.nonzero(tangled)
+  return [(min(ii, jj), max(ii, jj)) for ii, jj in
+          zip(rows.tolist(), nbrs[rows, cols].tolist())]
+
+def shortcut_pairs(string, periodic=None, k=nearest_neighbors.KNN):
+  """(image, image) edges of the shortest path graph cheaper than the
+     links between them"""
+
+  string = np.asarray(string, dtype=float)
+  nimages = string.shape[0]
+  if nimages < 3:
+    return []
+
+  index = neighbor_index.NeighborIndex(string, periodic)
+  dist, nbrs = index.knn(min(k, nimages - 1))
+
+  # cost of the string in order up to every image, as the walk adds it
+  links = index.distances(np.arange(nimages - 1), np.arange(1, nimages))
+  chain = np.zeros(nimages)
+  chain[1:] = np.cumsum(links**2)
+
+  images = np.arange(nimages)[:, np.newaxis]
+  ahead = (nbrs > images + 1) & (nbrs < nimages)
+  shortcut = ahead & (chain[:, np.newaxis] + dist**2 <
+                      chain[np.minimum(nbrs, nimages - 1)])
+
+  rows, cols = np.nonzero(shortcut)
+  return list(zip(rows.tolist(), nbrs[rows, cols].tolist()))
+
+def detect(string, periodic=None, knots='inc_num'):
+  """Returns the report of the tangled spans of an (nimages, nvars) string
+     for the walk knots of nearest_neighbors.WALKS"""
+
+  start = time.time()
+  if knots == 'shortest':
+    spans = merge_spans(shortcut_pairs(string, periodic))
+  else:
+    spans = merge_spans(tangled_pairs(string, periodic))
+
+  return {'spans': spans,
+          'nimages': span_images(spans),
+          'cost': time.time() - start}
+
+def format_report(report, cycle=None):
+  """One line summary of a report"""
+
+  where = ''
+  if cycle is not None:
+    where = ' CYCLE %s' % cycle
+
+  spans = ' '.join(['%s-%s' % span for span in report['spans']])
+  return 'KNOTS%s: %s spans, %s images %s(%.4f s)' \
+         % (where, len(report['spans']), report['nimages'],
+            spans + ' ' if spans else '', report['cost'])
+
+#--------#
+#  MAIN  #
+#--------#
+
+if __name__ == '__main__':
+
+  string = string_io.read_string(sys.argv[1], int(sys.argv[2]))
+  knots = 'inc_num'
+  if len(sys.argv) > 3:
+    knots = sys.argv[3]
+
+  print(format_report(detect(string, knots=knots)))
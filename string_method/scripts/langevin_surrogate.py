@@ -0,0 +1,242 @@
+#!/usr/bin/python
+
+""" langevin_surrogate.py: Overdamped Langevin stand-in for the CHARMM jobs
+                           of a string method cycle
+
+      Usage: python langevin_surrogate.py <pmf_file> <nimages> <cycle> <ntraj> [seed]
+
+             charmm_job.SURROGATE = 'alad_2d_pmf.dat'
+
+      Description: Runs the protocol of run_string.inp for every evolved
+                   image of a cycle at once, as overdamped Langevin dynamics
+                   of (phi, psi) on the umbrella sampling PMF:
+
+                     1. restrained push to the target tref read from
+                        img_<img>_cycle_<prev>.str (harmonic dihedral
+                        restraints with the force constant of the .str)
+                     2. restrained dynamics to seed the swarm: ntraj
+                        restrained runs of nsavc steps from the pushed
+                        point, in place of one run saving a frame every
+                        nsavc steps
+                     3. ntraj short unrestrained trajectories, one per frame
+
+                   Each image starts from the phi,psi of its
+                   img_<img>_cycle_<prev>.cor when that file exists,
+                   otherwise from its restraint target. All trajectories of
+                   all images are integrated as one (nimages, ntraj, 2)
+                   array, so a cycle takes NPUSH + NSAVC + NSWARM steps.
+
+                   The files written are those of run_string.inp, so the
+                   surrogate can stand in for CHARMM in the cycle: with
+                   charmm_job.SURROGATE set (or STRING_SURROGATE in the
+                   environment) to the PMF file, charmm_job.run_image runs
+                   run_images for its image instead of CHARMM. The .cor
+                   after the push holds only the backbone atoms of phi and
+                   psi, enough for the next cycle and string_cycle's
+                   seed_images.
+
+                   Energies are in kcal/mol and angles in degrees; the
+                   restraint force constant is per rad^2 as in CHARMM.
+
+      Input: pmf_file - the umbrella sampling PMF, alad_2d_pmf.dat
+             nimages - the number of images
+             cycle - the iteration cycle of the string method
+             ntraj - the number of trajectories in the swarm
+             seed - optional seed of the random number generator
+
+             img_<img>_cycle_<prev>.str - restraint stream files
+
+      Output: img_<img>_cycle_<cycle>.cor - the coordinates after the push
+              img_<img>_cycle_<cycle>_pushed.var - col vars after the push
+              img_<img>_cycle_<cycle>.swm<traj> - the swarms of trajectories
+                                                                         """
+
+import os, sys
+import numpy as np
+import pbc, pmf_surface, string_io
+
+KT     = 0.596       # kcal/mol, 300 K
+STEP   = 1.0         # mobility * timestep, deg^2 / (kcal/mol)
+NPUSH  = 500         # restrained push steps
+NSAVC  = 10          # restrained steps of each swarm frame
+NSWARM = 10          # unrestrained steps of each swarm trajectory
+MODE   = 'bicubic'   # PMF interpolation
+NTRAJ  = 100         # swarm trajectories of run_string.inp
+
+# backbone of the .cor files: bond length (A) and bond angle (deg)
+BOND   = 1.45
+ANGLE  = 111.
+ATOMS  = ('CLP', 'NL', 'CA', 'CRP', 'NR')
+
+RAD = np.pi / 180.
+
+#------------------#
+# Helper Functions #
+#------------------#
+
+def dihedral(p0, p1, p2, p3):
+  """Returns the dihedral angle in degrees, -180 < theta < 180"""
+
+  b0 = p0 - p1
+  b1 = p2 - p1
+  b2 = p3 - p2
+  b1 = b1 / np.linalg.norm(b1)
+
+  v = b0 - np.dot(b0, b1) * b1
+  w = b2 - np.dot(b2, b1) * b1
+
+  return np.degrees(np.arctan2(np.dot(np.cross(b1, v), w), np.dot(v, w)))
+
+def read_cor_phi_psi(fname):
+  """Returns (phi, psi) of the alanine dipeptide in a CHARMM .cor file"""
+
+  cfile = open(fname, 'r')
+  lines = [line.split() for line in cfile.readlines()
+           if not line.startswith('*')]
+  cfile.close()
+
+  # atom lines: atomno resno resname type x y z segid resid weight
+  coords = {}
+  for fields in lines[1:]:
+    coords[fields[3]] = np.array(fields[4:7], dtype=float)
+
+  phi = dihedral(coords['CLP'], coords['NL'], coords['CA'], coords['CRP'])
+  psi = dihedral(coords['NL'], coords['CA'], coords['CRP'], coords['NR'])
+
+  return np.array([phi, psi])
+
+def place_atom(a, b, c, torsion):
+  """Position of the atom d bonded to c with the dihedral a-b-c-d"""
+
+  bc = (c - b) / np.linalg.norm(c - b)
+  normal = np.cross(b - a, bc)
+  normal = normal / np.linalg.norm(normal)
+
+  # bond in the frame of bc, the a-b-c plane and its normal
+  theta, torsion = ANGLE * RAD, torsion * RAD
+  bond = BOND * np.array([-np.cos(theta),
+                          np.sin(theta) * np.cos(torsion),
+                          np.sin(theta) * np.sin(torsion)])
+  frame = np.array([bc, np.cross(normal, bc), normal]).T
+
+  return c + np.dot(frame, bond)
+
+def write_cor(fname, colvars):
+  """Writes a CHARMM card .cor of the phi,psi backbone atoms"""
+
+  # CLP, NL and CA in the xy plane, CA at the origin
+  theta = ANGLE * RAD
+  nl = np.array([-BOND, 0., 0.])
+  coords = [nl + BOND * np.array([np.cos(theta), np.sin(theta), 0.]), nl,
+            np.zeros(3)]
+  coords.append(place_atom(coords[0], coords[1], coords[2], colvars[0]))
+  coords.append(place_atom(coords[1], coords[2], coords[3], colvars[1]))
+
+  cfile = open(fname, 'w')
+  cfile.write('* LANGEVIN SURROGATE, PHI = %.5f PSI = %.5f\n*\n' % tuple(colvars))
+  cfile.write('%5d\n' % len(ATOMS))
+  for atom, (name, xyz) in enumerate(zip(ATOMS, coords), 1):
+    cfile.write('%5d    1 ALAD %-4s %9.5f %9.5f %9.5f ALAD 1      0.00000\n'
+                % ((atom, name) + tuple(xyz)))
+  cfile.close()
+
+def force(pmf, x, tref=None, kforce=None):
+  """Returns the force (-gradient) on x, plus the restraints if given"""
+
+  grad = pmf.interpolate(x, MODE)[1]
+
+  if tref is not None:
+    # E = k * d^2 with d the minimum image distance in radians
+    delta = pbc.wrap(x - tref)
+    grad = grad + 2. * kforce * delta * RAD * RAD
+
+  return -grad
+
+def integrate(pmf, x, nsteps, rng, tref=None, kforce=None):
+  """Overdamped Langevin steps on every row of x at once"""
+
+  noise = np.sqrt(2. * KT * STEP)
+
+  for step in range(nsteps):
+    x = x + STEP * force(pmf, x, tref, kforce) \
+          + noise * rng.standard_normal(x.shape)
+
+  return x
+
+#-----------------#
+# Surrogate cycle #
+#-----------------#
+
+def run_cycle(pmf, start, tref, kforce, ntraj, rng):
+  """Push, sample and shoot the swarms of every image
+
+     start, tref and kforce are (nimages, 2) arrays. Returns the pushed
+     col vars (nimages, 2) and the swarm end points (nimages, ntraj, 2)."""
+
+  # 1. Push system to target
+  x = integrate(pmf, start, NPUSH, rng, tref, kforce)
+  pushed = x
+
+  # 2. Restrained dynamics, every frame from its own run of NSAVC steps
+  frames = np.repeat(x[:, np.newaxis], ntraj, axis=1)
+  frames = integrate(pmf, frames, NSAVC, rng, tref[:, np.newaxis],
+                     kforce[:, np.newaxis])
+
+  # 3. Free swarms from every frame of every image
+  swarms = integrate(pmf, frames, NSWARM, rng)
+
+  return pushed, swarms
+
+def write_var(fname, colvars):
+  """Writes col vars one per line, like the CHARMM write title"""
+
+  vfile = open(fname, 'w')
+  vfile.write(''.join(['%r\n' % val for val in colvars.tolist()]))
+  vfile.close()
+
+def run_images(pmf, images, cycle, ntraj, rng):
+  """Runs the evolved images of a cycle from their .str and .cor files of
+     the cycle before, and writes their files of this cycle"""
+
+  prev = cycle - 1
+  tref   = np.zeros((len(images), 2))
+  kforce = np.zeros((len(images), 2))
+  start  = np.zeros((len(images), 2))
+
+  for row, img in enumerate(images):
+    tref[row], kforce[row] = string_io.read_stream('img_%s_cycle_%s.str' % (img, prev))
+    corfile = 'img_%s_cycle_%s.cor' % (img, prev)
+    if os.path.isfile(corfile):
+      start[row] = read_cor_phi_psi(corfile)
+    else:
+      start[row] = tref[row]
+
+  pushed, swarms = run_cycle(pmf, start, tref, kforce, ntraj, rng)
+  pushed = pbc.wrap(pushed)
+  swarms = pbc.wrap(swarms)
+
+  for row, img in enumerate(images):
+    write_cor('img_%s_cycle_%s.cor' % (img, cycle), pushed[row])
+    write_var('img_%s_cycle_%s_pushed.var' % (img, cycle), pushed[row])
+    for traj in range(ntraj):
+      write_var('img_%s_cycle_%s.swm%s' % (img, cycle, traj), swarms[row, traj])
+
+#--------#
+#  MAIN  #
+#--------#
+
+if __name__ == '__main__':
+
+  pmf_file = sys.argv[1]
+  nimages  = int(sys.argv[2])
+  cycle    = int(sys.argv[3])
+  ntraj    = int(sys.argv[4])
+  seed     = None
+  if len(sys.argv) > 5:
+    seed = int(sys.argv[5])
+
+  rng  = np.random.RandomState(seed)
+  pmf  = pmf_surface.read_pmf(pmf_file)
+
+  # Evolved images only, the end points never move
+  run_images(pmf, list(range(1, nimages - 1)), cycle, ntraj, rng)
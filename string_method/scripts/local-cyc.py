@@ -0,0 +1,131 @@
+#!/usr/bin/python
+
+"""local-cyc.py: Runs string method cycles on the cores of a single machine,
+                 the local counterpart of bsub-cyc.sh.
+
+     Usage: python local-cyc.py <startcycle> <endcycle> [nvars] [nimages] [ntraj] [nproc]
+
+     Description: Runs the CHARMM jobs of the evolved images of a cycle on a
+                  pool of nproc worker processes (default: all cores), with
+                  the same ABNORMAL re-runs as manage_image.py. Once every
+                  image is done, the last image's work of manage_image_last.py
+                  runs in this process: the string update, the clean up and
+                  the stream files for the next cycle. The cycles run one
+                  after another.
+
+                  The defaults of nvars, nimages and ntraj are the ones of
+                  gen-bsub-cyc.py. No as.<image>.<cycle>.sh scripts are
+                  needed.
+
+                  With a refine table, the number of images changes from
+                  the cycles listed on, and only the images of each cycle
+                  are run (see string_cycle.image_count).
+
+                  With STRING_SURROGATE set to the PMF file, the images are
+                  run by the Langevin surrogate instead of CHARMM, with
+                  ntraj trajectories each (see charmm_job.py).
+
+     Input: startcycle - the starting iteration
+            endcycle - the last iteration
+            nvars - the number of col vars
+            nimages - the number of images in the string
+            ntraj - the number of trajectories in the swarm
+            nproc - the number of CHARMM jobs run at once
+
+     Output: See manage_image_last.py
+                                                                            """
+import multiprocessing, sys, time
+import annealing, charmm_job, seeds, spline_reparam, string_cycle, swarm_store
+
+#-------------------#
+# Initial Variables #
+#-------------------#
+
+nvars   = 2   # number of collective variables
+nimages = 39  # number of images in string
+refine  = {}  # {first cycle: nimages}, e.g. {30: 51, 60: 63}
+ntraj   = 100
+push    = False  # see manage_image_last.py
+metric  = False  # see metric_update.py
+periodic = [True, True]  # phi,psi are angles, one flag per col var; see pbc.py
+knots   = 'inc_num'  # knot removal, see nearest_neighbors.WALKS
+schedule_name   = 'cosine'  # push schedule and parameters, see annealing.py
+schedule_params = {'period': annealing.PERIOD}
+density  = None  # spline image density, e.g. 'energy'; see spline_reparam.py
+pmf_file = spline_reparam.PMF_FILE  # PMF of the energy and curvature densities
+
+#------------------#
+# Helper Functions #
+#------------------#
+
+def run_image(args):
+  """Pool task: the CHARMM job of one image"""
+
+  image, cycle, nvars, ntraj, root = args
+  attempts = charmm_job.run_image(image, cycle, root, ntraj)
+  swarm_store.append_image(cycle, image, nvars)
+
+  return image, attempts
+
+#--------#
+#  MAIN  #
+#--------#
+
+if __name__ == '__main__':
+
+  if len(sys.argv) < 3:
+    sys.exit('Usage: python local-cyc.py <startcycle> <endcycle> [nvars] '
+             '[nimages] [ntraj] [nproc]')
+
+  startcycle = int(sys.argv[1])
+  endcycle   = int(sys.argv[2])
+  if len(sys.argv) > 3:
+    nvars   = int(sys.argv[3])
+  if len(sys.argv) > 4:
+    nimages = int(sys.argv[4])
+  if len(sys.argv) > 5:
+    ntraj   = int(sys.argv[5])
+  nproc = multiprocessing.cpu_count()
+  if len(sys.argv) > 6:
+    nproc = int(sys.argv[6])
+
+  # the seeds of every job derive from it, see seeds.py
+  root = seeds.root_seed()
+
+  pool = multiprocessing.Pool(nproc)
+
+  # the push of every cycle, evaluated once
+  schedule = annealing.Schedule(schedule_name, endcycle, **schedule_params)
+
+  # the PMF is read once for every cycle
+  spacing = None
+  if density is not None:
+    spacing = spline_reparam.Spacing(density, pmf_file, periodic=periodic)
+
+  for cycle in range(startcycle, endcycle+1):
+
+    print('RUNNING ... CYCLE = %s' % cycle)
+    start = time.time()
+
+    # this cycle's images and the next one's
+    count = string_cycle.image_count(cycle, nimages, refine)
+    new_count = string_cycle.image_count(cycle+1, nimages, refine)
+
+    # Evolved images 1 to count-2, all at once
+    jobs = [(image, cycle, nvars, ntraj, root) for image in range(1, count-1)]
+    for image, attempts in pool.imap_unordered(run_image, jobs):
+      print('IMAGE %s CYCLE %s FINISHED (%s attempts)' % (image, cycle, attempts))
+
+    # Barrier passed: every image of the cycle is done
+    string, stages = string_cycle.run_cycle(nvars, count, cycle, ntraj, push,
+                                           schedule, periodic=periodic,
+                                           metric=metric, root=root,
+                                           knots=knots, spacing=spacing,
+                                           new_nimages=new_count)
+    string_cycle.clean_up(cycle)
+    string_cycle.write_cycle(string, cycle, stages[0][1], periodic)
+
+    print('CYCLE = %s COMPLETED in %.1f s' % (cycle, time.time() - start))
+
+  pool.close()
+  pool.join()
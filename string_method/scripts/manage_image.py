@@ -3,7 +3,7 @@
 """manage_image.py: A simple wrapper for launching the CHARMM job to submit the
                     string method                           
 
-    Usage: manage_image.py <image> <cycle> <nvars>
+    Usage: manage_image.py <image> <cycle> <nvars> [ntraj]
     
     Description: manage_image.py generates random seeds for different initial
                  for the IC of the trajectories. This script simply passes
@@ -15,37 +15,33 @@
     Input: image - the image number
            cycle - the iteration of the string
            nvars - the number of col vars
+           ntraj - the number of trajectories in the swarm, only used by
+                   the surrogate of charmm_job.py
     
     Output: See run_string.inp
+            img_<image>_cycle_<cycle>.done - marker of a finished image
                                                                             """
 
-import os, sys, random
+import sys
+import charmm_job, file_events, swarm_store
 
 image   = int(sys.argv[1])
 cycle   = int(sys.argv[2])
 nvars   = int(sys.argv[3])
+ntraj   = None
+if len(sys.argv) > 4:
+  ntraj = int(sys.argv[4])
 
 prev = cycle-1
 
-while 1:  # wait for string file to be written
-  if os.path.isfile('string_%s.dat' % prev):
-    os.system('sleep 1s')
-    break
-  else:
-    os.system('sleep 10s')
+# wait for string file to be written (renamed into place when complete)
+file_events.wait_for(['string_%s.dat' % prev])
 
-while 1: # Re-run if ABNORMAL termination
+# Re-run if ABNORMAL termination
+charmm_job.run_image(image, cycle, ntraj=ntraj)
 
-  isee1 = random.randint(100,1000000)
-  isee2 = random.randint(100,1000000)
-  isee3 = random.randint(100,1000000)    
-  isee4 = random.randint(100,1000000)
-    
-  os.system('c36b1_large cycle=%s image=%s isee1=%s isee2=%s isee3=%s isee4=%s < run_string.inp > img_%s_cycle_%s.out' % \
-           (cycle, image, isee1, isee2, isee3, isee4, image, cycle))
-
-  output = open('img_%s_cycle_%s.out' % (image, cycle), 'r')
-  output.seek(-5000,2)  # Go to 5000 bytes from end of file.
-  outtail = output.read()
-  if outtail.find('ABNORMAL') == -1:
-    break
+# pack the .swm files of this image into its shard of the swarm store
+swarm_store.append_image(cycle, image, nvars)
+
+# tell manage_image_last.py this image is done
+file_events.mark_done('img_%s_cycle_%s.done' % (image, cycle))
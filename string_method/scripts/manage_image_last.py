@@ -3,22 +3,24 @@
 """manage_image_last.py: A simple wrapper for launching the last CHARMM job in
                          the string method.
 
-     Usage: manage_image_last.py <image> <cycle> <nvars> <nimages> <ntraj>
+     Usage: manage_image_last.py <image> <cycle> <nvars> <nimages> <ntraj> [new_nimages]
 
      Description: manage_image.py submits the last CHARMM job in the cycle,
                   computes the average trajectories in the swarm, and
                   reparametrizes the string. Lastly, it cleans up the
                   directory.
 
-                  This is taken care of in separate python scripts. See
-                  compute_string.py, wstring_reparam.py, run_string.inp for
-                  more information.
+                  The string update runs in-process, see string_cycle.py,
+                  compute_string.py, string_reparam.py and run_string.inp
+                  for more information.
 
      Input: image - the image number
             cycle - the iteration of the string method
             nvars - the number of col vars
             nimages - the number of images
             ntraj - the number of trajectories in the swarm
+            new_nimages - the number of images of the next cycle (default
+                          nimages), see gen-bsub-cyc.py
 
      Output: See scripts above for more information.
 
@@ -27,79 +29,82 @@
 # Initialization #
 #----------------#
 
-import os, sys, random
+import sys
+import annealing, charmm_job, file_events, spline_reparam, string_cycle, \
+       swarm_store
 
 image   = int(sys.argv[1])
 cycle   = int(sys.argv[2])
 nvars   = int(sys.argv[3])
 nimages = int(sys.argv[4])
 ntraj   = int(sys.argv[5])
+new_nimages = nimages
+if len(sys.argv) > 6:
+  new_nimages = int(sys.argv[6])
 
 prev = cycle-1
 
+# Simulated annealing push and nearest-neighbor knot removal,
+# see string_push.py and nearest_neighbors.py
+push = False
+
+# knot removal: 'inc_num', 'no_revisit' or 'shortest'
+knots = 'inc_num'
+
+# the push and knot removal schedule, see annealing.py
+schedule = annealing.Schedule('cosine', cycle, period=annealing.PERIOD)
+
+# Swarm covariance metric update, see metric_update.py
+metric = False
+
+# Col vars that are angles, continuous across the +-180 seam within a cycle:
+# phi,psi of alad, one flag per col var; None for the angle blocks of pbc.py,
+# which are all past the 2 col vars of alad
+periodic = [True, True]
+
+# Spline reparametrization, the density of its images: None for the
+# straight links, 'uniform', or from the PMF 'energy' or 'curvature';
+# see spline_reparam.py
+density = None
+spacing = None
+if density is not None:
+  spacing = spline_reparam.Spacing(density, spline_reparam.PMF_FILE,
+                                   periodic=periodic)
+
 #----------------------------#
 # Launch the last CHARMM job #
 #----------------------------#
 
-while 1:  # wait for string file to be written
-  if os.path.isfile('string_%s.dat' % prev):
-    os.system('sleep 1s')
-    break
-  else:
-    os.system('sleep 10s')
-
-while 1: # Re-run if ABNORMAL termination
-
-  isee1 = random.randint(100,1000000)
-  isee2 = random.randint(100,1000000)
-  isee3 = random.randint(100,1000000)    
-  isee4 = random.randint(100,1000000)
-    
-  os.system('c36b1_large cycle=%s image=%s isee1=%s isee2=%s isee3=%s isee4=%s < run_string.inp > img_%s_cycle_%s.out' % \
-           (cycle, image, isee1, isee2, isee3, isee4, image, cycle))
-       
-  output = open('img_%s_cycle_%s.out' % (image, cycle), 'r')
-  output.seek(-5000,2)  # Go to 5000 bytes from end of file.
-  outtail = output.read()
-  if outtail.find('ABNORMAL') == -1:
-    break
+# wait for string file to be written (renamed into place when complete)
+file_events.wait_for(['string_%s.dat' % prev])
+
+# Re-run if ABNORMAL termination
+charmm_job.run_image(image, cycle, ntraj=ntraj)
+
+# pack the .swm files of this image into its shard of the swarm store
+swarm_store.append_image(cycle, image, nvars)
 
 #-----------------------------------------------#
 # Reparametrize the string and analyze the data #
 #-----------------------------------------------#
 
-while 1:  # wait for cycle to finish (.o files to be written)
-  os.system('sleep 10s')
-  img_done = 0
-  for img in range(1, nimages - 2):  # Count only evolved images:1-41
-    if os.path.isfile('as.%s.%s.o' % (img, cycle)):
-      img_done += 1
-  if img_done == (nimages-3):
-    break
+# wait for cycle to finish, count only evolved images:1-41
+file_events.wait_for(['img_%s_cycle_%s.done' % (img, cycle)
+                      for img in range(1, nimages - 2)])
 
-os.system('./get_pstring.py %s %s' %(nimages, cycle))
-os.system('./compute_string.py %s %s %s %s ' %(nvars, nimages, cycle, ntraj)) 
-os.system('./string_reparam.py %s %s string_unparam_%s.dat > string_%s.dat' \
-       % (nvars, nimages, cycle, cycle))
+# pushed, unparam (normal, nn) strings are written as they are computed
+string, stages = string_cycle.run_cycle(nvars, nimages, cycle, ntraj, push,
+                                       schedule, periodic=periodic, metric=metric,
+                                       knots=knots, spacing=spacing,
+                                       new_nimages=new_nimages)
 
 # -----------------------#
 # Clean up the directory #
 #------------------------#
 
-os.system('/bin/rm img_*_cycle_%s.dcd' % cycle)
-os.system('/bin/rm img_*_cycle_%s_pushed.var' %cycle)
-
-os.system('mv img_*_cycle_%s.cor 0cor/' % prev)
-os.system('mv img_*_cycle_%s.str 0str/' % prev)
-os.system('mv string_%s.dat 0dat/' %prev)
-
-os.system('mv img_*_cycle_%s.out 0out/' % cycle)
-os.system('mv img_*_cycle_%s.swm* 0swm/' % cycle)
-
-# These files aren't generated in cycle 1.
-if prev > 1:
-  os.system('mv string_unparam_%s.dat 0dat/' % prev)
-  os.system('mv string_pushed_%s.dat 0dat/' % prev)
+string_cycle.clean_up(cycle)
 
-# Generate stream files for next iteration
-os.system('./gen-img-stream.py %s %s %s' %(nimages, nvars, cycle))
+# Generate stream files for next iteration (and the .cor of its images
+# when their number changes), then string_<cycle>.dat which the next
+# cycle waits for
+string_cycle.write_cycle(string, cycle, stages[0][1], periodic)
@@ -0,0 +1,181 @@
+#!/usr/bin/python
+
+""" metric_update.py: String update in the metric of the swarm covariance
+
+      Usage: python metric_update.py <nvars> <nimg> <cycle> <ntraj> [periodic]
+
+      Description: The plain update moves every image to its swarm mean and
+                   spaces the images equally in Euclidean col var space. When
+                   the col vars diffuse at very different rates, the images
+                   in slow regions barely move per cycle and the equal
+                   spacing crowds the images along the fast col vars.
+
+                   The covariance C of the swarm displacements of an image
+                   (see swarm_analysis.py) is an estimate of its diffusion
+                   tensor, the metric of the string method in collective
+                   variables. The metric update uses it twice:
+
+                     drift - each image moves by w * drift from its pushed
+                             start point, with the mobility weight
+                             w = <tr C> / tr C, the mean trace over the
+                             images by the trace of the image, clipped to
+                             [1/MAX_WEIGHT, MAX_WEIGHT]. Slowly diffusing
+                             images take longer steps. w is a scalar per
+                             image, so the converged path (drift along the
+                             string) is the same as with the plain update.
+
+                             This is a scalar mobility weight, not the
+                             covariance tensor applied to the drift. The
+                             swarm drift already carries the diffusion
+                             tensor (it is C grad F over the swarm time),
+                             and a tensor weight such as <tr C>/nvars C^-1
+                             would undo it. The string would then settle on
+                             the Euclidean path rather than the one in the
+                             diffusion metric that the reparametrization
+                             below spaces the images in. The anisotropy of
+                             C only enters through that reparametrization.
+                     reparametrization - the link between images i, i+1
+                             has length sqrt(d.G.d), G the inverse of the
+                             mean covariance of the two images scaled by
+                             <tr C> / nvars, so the images are equidistant
+                             in the diffusion metric. For an isotropic,
+                             uniform covariance G is the identity and the
+                             update is the plain one.
+
+                   The covariances are regularized by REGULARIZE times
+                   their mean variance on the diagonal, so a collapsed
+                   swarm still has an invertible metric. The fixed images
+                   use the covariance of their evolved neighbor. A string
+                   with another number of images than the swarms (after
+                   the knot removal, or refined to another image count)
+                   takes the covariances interpolated at the fraction of
+                   its arc length of each of its images.
+
+                   Used by string_cycle.py with metric set to 1.
+
+      Input: nvars - the number of col vars
+             nimg - the number of images
+             cycle - the iteration of the string method
+             ntraj - the number of trajectories in the swarm
+             periodic - one 0/1 flag per col var, e.g. 11 for phi,psi
+
+      Output: string_metric_<cycle>.dat - the metric update of the string,
+                                          reparametrized
+                                                                         """
+
+import sys
+import numpy as np
+import compute_string, reparam, string_io, swarm_analysis
+
+MAX_WEIGHT = 4.
+REGULARIZE = 1.e-3
+
+#------------------#
+# Helper Functions #
+#------------------#
+
+def regularize(cov):
+  """Adds a fraction of the mean variance to the diagonal of (..., n, n)"""
+
+  nvars = cov.shape[-1]
+  scale = np.trace(cov, axis1=-2, axis2=-1) / nvars
+
+  # a swarm that did not move at all still needs a metric
+  scale = np.where(scale > 0, scale, 1.)
+
+  return cov + REGULARIZE * scale[..., np.newaxis, np.newaxis] * np.eye(nvars)
+
+def image_covariances(cov):
+  """(nimg, nvars, nvars) covariances of every image from those of the
+     evolved images, the fixed images take their neighbor's"""
+
+  cov = regularize(np.asarray(cov, dtype=float))
+
+  return np.concatenate([cov[:1], cov, cov[-1:]])
+
+def mobility_weights(cov):
+  """Scalar step weights of the images, mean trace over trace; a scalar
+     per image, the direction of the drift is kept"""
+
+  trace = np.trace(cov, axis1=-2, axis2=-1)
+
+  return np.clip(trace.mean() / trace, 1. / MAX_WEIGHT, MAX_WEIGHT)
+
+def link_metrics(cov):
+  """(nimg-1, nvars, nvars) metric tensors of the links of a string from
+     the (nimg, nvars, nvars) covariances of its images"""
+
+  nvars = cov.shape[-1]
+  scale = np.trace(cov, axis1=-2, axis2=-1).mean() / nvars
+
+  return scale * np.linalg.inv(0.5 * (cov[:-1] + cov[1:]))
+
+def string_covariances(string, cov):
+  """(nimg, nvars, nvars) covariances of the images of an (nimg, nvars)
+     string from the covariances of a string of another number of images,
+     matched by the fraction of the arc length"""
+
+  string = np.asarray(string, dtype=float)
+  if len(string) == len(cov):
+    return cov
+
+  # the images of cov are spaced equally along the string
+  links = np.sqrt(np.sum(np.diff(string, axis=0)**2, axis=1))
+  frac = np.zeros(len(string))
+  frac[1:] = np.cumsum(links)
+  if frac[-1] > 0:
+    frac /= frac[-1]
+
+  pos = frac * (len(cov) - 1)
+  low = np.clip(np.floor(pos).astype(int), 0, len(cov) - 2)
+  weight = (pos - low)[:, np.newaxis, np.newaxis]
+
+  return (1. - weight) * cov[low] + weight * cov[low + 1]
+
+#--------#
+# Update #
+#--------#
+
+def update_string(string, summary):
+  """Moves the evolved images of an (nimg, nvars) string by their weighted
+     drift from the start points of a swarm summary
+
+     The weights are the scalars of mobility_weights, not tensors. The
+     fixed images of string are kept."""
+
+  new_string = np.array(string, dtype=float)
+  weights = mobility_weights(regularize(summary['cov']))
+  new_string[1:-1] = summary['start'] + weights[:, np.newaxis] * summary['drift']
+
+  return new_string
+
+def reparametrize(string, nimages, summary):
+  """Reparametrizes a string to nimages images, equidistant in the metric
+     of the swarm covariances, folds the unsigned angle vars"""
+
+  cov = string_covariances(string, image_covariances(summary['cov']))
+  metric = link_metrics(cov)
+  new_string = reparam.reparametrize(string, nimages, metric=metric)
+
+  return reparam.fold_unsigned(new_string)
+
+#--------#
+#  MAIN  #
+#--------#
+
+if __name__ == '__main__':
+
+  nvars = int(sys.argv[1])
+  nimg  = int(sys.argv[2])
+  cycle = int(sys.argv[3])
+  ntraj = int(sys.argv[4])
+  periodic = None
+  if len(sys.argv) > 5:
+    periodic = [flag == '1' for flag in sys.argv[5]]
+
+  summary = swarm_analysis.analyze_cycle(nvars, nimg, cycle, ntraj, periodic)
+  string = update_string(compute_string.get_string(nvars, nimg, cycle, ntraj,
+                                                   periodic), summary)
+
+  string_io.write_string('string_metric_%s.dat' %cycle,
+                         reparametrize(string, nimg, summary))
@@ -0,0 +1,135 @@
+#!/usr/bin/python
+
+""" nearest_neighbors.py: Nearest-neighbor knot removal for the string
+
+      Usage: import nearest_neighbors
+             string = nearest_neighbors.remove_knots(string)
+
+      Description: Starting at image 0, the walk moves to the nearest image
+                   with a higher image number than the current one, until it
+                   reaches the last image. Images skipped by the walk are the
+                   ones caught in a knot; they are dropped from the string and
+                   the reparametrization adds images back in their place.
+
+                   unvisited_walk is the walk of
+                   calc_nearest_neighbors_no_revisit.py instead: it moves to
+                   the nearest image not visited yet, in any direction.
+
+                   Both walks query a NeighborIndex built once for the
+                   string (see neighbor_index.py), in O(n log n) for the
+                   whole walk, with the minimum image for the periodic col
+                   vars.
+
+                   shortest_path does not walk greedily: it takes the k
+                   nearest images of every image (KNN), plus the link to
+                   the next image, as the edges of a graph that only runs
+                   forward along the string, and finds the path from image
+                   0 to the last image of least cost by dynamic
+                   programming over the images in order, O(n k). The cost
+                   of an edge is its squared length: by the triangle
+                   inequality a plain length would always favour the
+                   longest shortcut, while the squared length keeps every
+                   image of a smooth string and only cuts across a knot,
+                   where a far image along the string is close in space.
+                   Equal costs go to the path with more images, so the
+                   result does not depend on the order of ties.
+
+                   See calc_nearest_neighbors_inc_num.py for the command line
+                   version.
+                                                                         """
+
+import numpy as np
+import neighbor_index
+
+KNN = 8     # edges from every image in the shortest path graph
+
+#------------------#
+# Nearest neighbor #
+#------------------#
+
+def nn_walk(string, periodic=None):
+  """Returns the image numbers visited from image 0 to the last image"""
+
+  string = np.asarray(string, dtype=float)
+  nimages = string.shape[0]
+  index = neighbor_index.NeighborIndex(string, periodic)
+
+  nn_list = [0]
+  ii = 0
+  index.remove(0)
+  while ii != (nimages - 1):
+    # the nearest neighbor further along the string, every image up to
+    # it is behind the walk from now on
+    nn = index.nearest(ii)
+    index.remove(np.arange(ii + 1, nn + 1))
+    ii = nn
+    nn_list.append(ii)
+
+  return nn_list
+
+def unvisited_walk(string, periodic=None):
+  """Returns the image numbers visited from image 0 to the last image,
+     moving to the nearest image not visited yet"""
+
+  string = np.asarray(string, dtype=float)
+  nimages = string.shape[0]
+  index = neighbor_index.NeighborIndex(string, periodic)
+
+  nn_list = [0]
+  ii = 0
+  index.remove(0)
+  while ii != (nimages - 1):
+    ii = index.nearest(ii)
+    index.remove(ii)
+    nn_list.append(ii)
+
+  return nn_list
+
+def shortest_path(string, periodic=None, k=KNN):
+  """Returns the image numbers of the least cost forward path from image 0
+     to the last image over the k nearest neighbor graph"""
+
+  string = np.asarray(string, dtype=float)
+  nimages = string.shape[0]
+  index = neighbor_index.NeighborIndex(string, periodic)
+  dist, nbrs = index.knn(min(k, nimages - 1))
+
+  # the link to the next image keeps the graph connected
+  links = index.distances(np.arange(nimages - 1), np.arange(1, nimages))
+  dist = np.hstack([dist[:-1], links[:, np.newaxis]])
+  nbrs = np.hstack([nbrs[:-1], np.arange(1, nimages)[:, np.newaxis]])
+
+  cost = np.empty(nimages)
+  cost.fill(np.inf)
+  cost[0] = 0.
+  hops = np.zeros(nimages, dtype=int)
+  prev = np.zeros(nimages, dtype=int)
+
+  # edges only run forward, so the images in order are a topological order
+  for ii in range(nimages - 1):
+    forward = (nbrs[ii] > ii) & (nbrs[ii] < nimages)
+    jj = nbrs[ii][forward]
+    new_cost = cost[ii] + dist[ii][forward]**2
+    better = (new_cost < cost[jj]) | \
+             ((new_cost == cost[jj]) & (hops[ii] + 1 > hops[jj]))
+    jj, new_cost = jj[better], new_cost[better]
+
+    cost[jj] = new_cost
+    hops[jj] = hops[ii] + 1
+    prev[jj] = ii
+
+  path = [nimages - 1]
+  while path[-1] != 0:
+    path.append(int(prev[path[-1]]))
+
+  return path[::-1]
+
+WALKS = {'inc_num': nn_walk, 'no_revisit': unvisited_walk,
+         'shortest': shortest_path}
+
+def remove_knots(string, periodic=None, walk=nn_walk):
+  """Returns the string without the images skipped by the walk"""
+
+  string = np.asarray(string, dtype=float)
+
+  return string[walk(string, periodic)]
@@ -0,0 +1,339 @@
+#!/usr/bin/python
+
+""" neighbor_index.py: Periodic spatial index of the images of a string
+
+      Usage: import neighbor_index
+             index = neighbor_index.NeighborIndex(string, periodic)
+             jj = index.nearest(ii)      # nearest live image to image ii
+             index.remove(jj)            # jj is no longer a candidate
+             dist, nbrs = index.knn(k)   # k nearest images of every image
+             jj = index.nearest_to(x)    # nearest live image to a point x
+
+      Description: Built once per string, the index answers the queries of
+                   the nearest-neighbor walks of nearest_neighbors.py: the
+                   nearest image to image ii among the images still live.
+                   The walks remove the images they can no longer visit, so
+                   a whole walk takes O(n log n) instead of a full sort of
+                   the distances at every step. knn gives the k nearest
+                   images of every image, live or not, for the neighbor
+                   graph of the shortest-path knot removal. nearest_to
+                   answers the same query for any point, e.g. the images
+                   of a new string against those of the last cycle.
+
+                   Distances use the minimum image for the periodic col vars
+                   (the torus of the dihedrals, period 360 degrees); the
+                   periodic mask defaults to the angle col vars of
+                   pbc.py. Ties go to the lower image number.
+
+                   With scipy, the index is a cKDTree with a periodic box,
+                   queried for more and more neighbors until one is live.
+                   Without it, a k-d tree in numpy keeps the number of live
+                   images under every node, so removed images are pruned
+                   from the search.
+                                                                         """
+
+import heapq
+import numpy as np
+import pbc
+
+try:
+  from scipy.spatial import cKDTree
+except ImportError:
+  cKDTree = None
+
+PERIOD   = pbc.PERIOD
+LEAFSIZE = 16
+
+#-------#
+# Index #
+#-------#
+
+class NeighborIndex:
+  """Nearest live image queries on the images of a string"""
+
+  def __init__(self, points, periodic=None, period=PERIOD, leafsize=LEAFSIZE,
+               use_scipy=True):
+
+    points = np.asarray(points, dtype=float)
+    if periodic is None:
+      periodic = pbc.angle_masks(points.shape[1])[0]
+
+    self.periodic = np.asarray(periodic, dtype=bool)
+    self.period = float(period)
+    self.points = pbc.box(points, self.periodic, self.period)
+    self.npoints = len(points)
+    self.live = np.ones(self.npoints, dtype=bool)
+    self.nlive = self.npoints
+
+    if use_scipy and cKDTree is not None:
+      # boxsize 0 is a non-periodic col var
+      self.tree = cKDTree(self.points, leafsize,
+                          boxsize=np.where(self.periodic, self.period, 0.))
+    else:
+      self.tree = None
+      self.build(leafsize)
+
+  def __len__(self):
+    return self.nlive
+
+  def distances(self, ii, others):
+    """Distances from image ii to the images others"""
+
+    return pbc.length(self.points[others] - self.points[ii],
+                      self.periodic, self.period)
+
+  def remove(self, images):
+    """Images that are no longer returned by nearest"""
+
+    for jj in np.atleast_1d(images).tolist():
+      if not self.live[jj]:
+        continue
+      self.live[jj] = False
+      self.nlive -= 1
+
+      if self.tree is None:
+        node = self.leaf_of[jj]
+        while node >= 0:
+          self.count[node] -= 1
+          node = self.parent[node]
+
+  def nearest(self, ii):
+    """The nearest live image to image ii other than itself, None if
+       there is none"""
+
+    # ii does not count as a candidate while the search runs
+    was_live = self.live[ii]
+    self.remove(ii)
+
+    nearest = self.query(self.points[ii])
+
+    if was_live:
+      self.restore(ii)
+
+    return nearest
+
+  def nearest_to(self, x):
+    """The nearest live image to the point x (nvars,), None if there is
+       none"""
+
+    x = pbc.box(np.asarray(x, dtype=float), self.periodic, self.period)
+
+    return self.query(x)
+
+  def query(self, x):
+    """The nearest live image to the boxed point x"""
+
+    if self.nlive == 0:
+      return None
+    elif self.tree is not None:
+      return self.query_scipy(x)
+
+    return self.query_tree(x)
+
+  def restore(self, ii):
+    """Makes a removed image live again"""
+
+    self.live[ii] = True
+    self.nlive += 1
+
+    if self.tree is None:
+      node = self.leaf_of[ii]
+      while node >= 0:
+        self.count[node] += 1
+        node = self.parent[node]
+
+  def knn(self, k):
+    """(nimages, k) distances and image numbers of the k nearest images of
+       every image, nearest first; rows are padded with inf and npoints
+       when there are fewer than k other images"""
+
+    k = int(k)
+    dist = np.empty((self.npoints, k))
+    dist.fill(np.inf)
+    nbrs = np.empty((self.npoints, k), dtype=int)
+    nbrs.fill(self.npoints)
+
+    if self.tree is not None:
+      nfound = min(k + 1, self.npoints)
+      found_dist, found = self.tree.query(self.points, nfound)
+      found_dist = np.reshape(found_dist, (self.npoints, nfound))
+      found = np.reshape(found, (self.npoints, nfound))
+
+      for ii in range(self.npoints):
+        others = found[ii] != ii
+        row_dist, row = found_dist[ii][others][:k], found[ii][others][:k]
+        dist[ii, :len(row)], nbrs[ii, :len(row)] = row_dist, row
+    elif k > 0 and self.npoints > 1:
+      found_dist, found = self.knn_tree(min(k, self.npoints - 1))
+      dist[:, :found.shape[1]], nbrs[:, :found.shape[1]] = found_dist, found
+
+    return dist, nbrs
+
+  #-------#
+  # scipy #
+  #-------#
+
+  def query_scipy(self, x):
+    """cKDTree search for the nearest live image, doubling k as needed"""
+
+    k = min(8, self.npoints)
+    while 1:
+      dist, idx = self.tree.query(x, k)
+      dist, idx = np.atleast_1d(dist), np.atleast_1d(idx)
+
+      # missing neighbors come back as npoints
+      found = idx < self.npoints
+      dist, idx = dist[found], idx[found]
+      ok = self.live[idx]
+      if ok.any():
+        dist, idx = dist[ok], idx[ok]
+        return int(idx[dist == dist[0]].min())
+
+      if k >= self.npoints:
+        return None
+      k = min(2 * k, self.npoints)
+
+  #------------#
+  # numpy tree #
+  #------------#
+
+  def build(self, leafsize):
+    """Builds the k-d tree: nodes over contiguous slices of self.order"""
+
+    self.order = np.arange(self.npoints)
+    lo, hi, start, end, left, right, parent = [], [], [], [], [], [], []
+
+    # (node, slice start, slice end), split at the median of the widest var
+    stack = [(-1, 0, self.npoints, 0)]
+    while stack:
+      par, first, last, side = stack.pop()
+      node = len(start)
+      block = self.points[self.order[first:last]]
+      lo.append(block.min(axis=0))
+      hi.append(block.max(axis=0))
+      start.append(first)
+      end.append(last)
+      left.append(-1)
+      right.append(-1)
+      parent.append(par)
+      if par >= 0:
+        (left, right)[side][par] = node
+
+      if last - first > leafsize:
+        dim = int(np.argmax(hi[-1] - lo[-1]))
+        mid = (last - first) // 2
+        part = np.argpartition(block[:, dim], mid)
+        self.order[first:last] = self.order[first:last][part]
+        stack.append((node, first + mid, last, 1))
+        stack.append((node, first, first + mid, 0))
+
+    # the searches and updates go node by node, plain lists are faster
+    self.lo, self.hi = np.array(lo), np.array(hi)
+    self.start, self.end = start, end
+    self.left, self.right = left, right
+    self.parent = parent
+    self.count = [last - first for first, last in zip(start, end)]
+
+    leaf_of = np.zeros(self.npoints, dtype=int)
+    for node in range(len(start)):
+      if left[node] < 0:
+        leaf_of[self.order[start[node]:end[node]]] = node
+    self.leaf_of = leaf_of.tolist()
+
+  def box_distances(self, x, nodes):
+    """Lower bounds of the distances from x to the points under nodes"""
+
+    below = self.lo[nodes] - x
+    above = x - self.hi[nodes]
+    gap = np.maximum(np.maximum(below, above), 0.)
+
+    # on the circle, the box may be closer the other way around
+    inside = (below <= 0) & (above <= 0)
+    around = np.minimum(np.mod(below, self.period), np.mod(above, self.period))
+    gap = np.where(self.periodic, np.where(inside, 0., around), gap)
+
+    return np.sqrt(np.sum(gap**2, axis=-1))
+
+  def query_tree(self, x):
+    """Best-first search of the numpy tree for the nearest live image"""
+
+    best, best_dist = None, np.inf
+    heap = [(0., 0)]
+
+    while heap:
+      bound, node = heapq.heappop(heap)
+      if bound > best_dist:
+        break
+      if self.count[node] == 0:
+        continue
+
+      if self.left[node] < 0:
+        members = self.order[self.start[node]:self.end[node]]
+        members = members[self.live[members]]
+        dist = pbc.length(self.points[members] - x, self.periodic, self.period)
+        near = dist.min()
+        jj = int(members[dist == near].min())
+        if near < best_dist or (near == best_dist and jj < best):
+          best, best_dist = jj, near
+        continue
+
+      children = [self.left[node], self.right[node]]
+      bounds = self.box_distances(x, children).tolist()
+      for child, bound in zip(children, bounds):
+        if self.count[child] and bound <= best_dist:
+          heapq.heappush(heap, (bound, child))
+
+    return best
+
+  def knn_tree(self, k):
+    """k nearest images of every image from the numpy tree, one leaf of
+       query images at a time"""
+
+    dist = np.empty((self.npoints, k))
+    dist.fill(np.inf)
+    nbrs = np.empty((self.npoints, k), dtype=int)
+    nbrs.fill(self.npoints)
+
+    leaves = np.array([node for node in range(len(self.start))
+                       if self.left[node] < 0])
+    lo, hi = self.lo[leaves], self.hi[leaves]
+
+    for leaf in leaves.tolist():
+      queries = self.order[self.start[leaf]:self.end[leaf]]
+
+      # lower bound of the distances between the leaf and every leaf
+      gap = np.maximum(np.maximum(lo - self.hi[leaf], self.lo[leaf] - hi), 0.)
+      span = np.maximum(hi, self.hi[leaf]) - np.minimum(lo, self.lo[leaf])
+      around = np.maximum(self.period - span, 0.)
+      gap = np.where(self.periodic, np.minimum(gap, around), gap)
+      bound = np.sqrt(np.sum(gap**2, axis=1))
+
+      # the nearest leaves with k + 1 images bound the kth distance
+      near = np.argsort(bound, kind='mergesort')
+      sizes = np.cumsum([self.end[node] - self.start[node]
+                         for node in leaves[near].tolist()])
+      first = near[:np.searchsorted(sizes, min(k + 1, self.npoints)) + 1]
+      radius = self.leaf_distances(queries, leaves[first], k)[0][:, -1].max()
+
+      # every leaf that can hold one of the k nearest images
+      row_dist, row = self.leaf_distances(queries, leaves[bound <= radius], k)
+      dist[queries], nbrs[queries] = row_dist, row
+
+    return dist, nbrs
+
+  def leaf_distances(self, queries, leaves, k):
+    """The k nearest of the images under leaves to each of queries, nearest
+       first and ties to the lower image number"""
+
+    members = np.sort(np.concatenate([self.order[self.start[node]:self.end[node]]
+                                      for node in leaves.tolist()]))
+    dist = pbc.length(self.points[members][np.newaxis] -
+                      self.points[queries][:, np.newaxis],
+                      self.periodic, self.period)
+    dist[members[np.newaxis] == queries[:, np.newaxis]] = np.inf
+
+    # stable sort: members are in image order
+    order = np.argsort(dist, axis=1, kind='mergesort')[:, :k]
+    rows = np.arange(len(queries))[:, np.newaxis]
+
+    return dist[rows, order], members[order]
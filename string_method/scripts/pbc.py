@@ -0,0 +1,151 @@
+#!/usr/bin/python
+
+""" pbc.py: Periodic boundary conditions of the col vars
+
+      Usage: import pbc
+             angle = pbc.angle_masks(nvar)[0]
+             diff = pbc.difference(x1, x2, angle)
+
+      Description: The angle col vars (dihedrals, in degrees) live on a
+                   circle of period 360. Every function works on arrays of
+                   any shape whose last axis is the col vars, and takes the
+                   periodic mask of the col vars: one boolean per col var,
+                   or a single boolean for all of them. Non-periodic col
+                   vars go through unchanged.
+
+                     wrap         - onto -180 <= a <= 180
+                     wrap_360     - onto 0 <= a <= 360
+                     box          - onto 0 <= a < 360, for spatial indexes
+                     min_image    - a difference, the short way around
+                     difference   - x2 - x1, the short way around
+                     distance     - Euclidean length of the difference
+                     interpolate  - x1 + t (x2 - x1), the short way around
+                     unwrap       - a path made continuous: each point is
+                                    the one before plus the difference
+
+                   The wraps are closed form, with no loop over the
+                   multiples of the period, and leave values already in
+                   range untouched (so +-180 both stay as they are).
+
+                   Inside a cycle (string_cycle.py) a string is a
+                   continuous path: the swarm averages are unwrapped from
+                   image 0, so a string that crosses the +-180 seam keeps
+                   going past it, and the reparametrization, push and knot
+                   removal see plain differences. The string_<cycle>.dat
+                   files hold this path. Angles are only wrapped where
+                   they leave the pipeline, in the .str restraint files of
+                   CHARMM (see string_io.py).
+
+                   The angle blocks of the col vars are those of the
+                   original string_reparam.py:
+                     j <  ang_var            - plain (non-periodic) vars
+                     ang_var <= j < uang_var - signed angles, -180 < a < 180
+                     j >= uang_var           - unsigned angles, 0 < a < 180
+                                                                         """
+
+import numpy as np
+
+PERIOD   = 360.
+ANG_VAR  = 14           # Index from 0
+UANG_VAR = 17
+
+#-------#
+# Masks #
+#-------#
+
+def angle_masks(nvar, ang_var=ANG_VAR, uang_var=UANG_VAR):
+  """Returns boolean masks (angle, unsigned) over the nvar col vars"""
+
+  index = np.arange(nvar)
+  angle = index >= ang_var
+  unsigned = index >= uang_var
+
+  return angle, unsigned
+
+#-------#
+# Wraps #
+#-------#
+
+def wrap(a, periodic=True, period=PERIOD):
+  """Maps the periodic values onto -period/2 <= a <= period/2"""
+
+  a = np.asarray(a, dtype=float)
+  half = 0.5 * period
+  up   = np.clip(np.ceil((a - half) / period), 0, None)
+  down = np.clip(np.ceil((-half - a) / period), 0, None)
+
+  return np.where(periodic, a - period * up + period * down, a)
+
+def wrap_360(a, periodic=True, period=PERIOD):
+  """Maps the periodic values onto 0 <= a <= period"""
+
+  a = np.asarray(a, dtype=float)
+  up   = np.clip(np.ceil((a - period) / period), 0, None)
+  down = np.clip(np.ceil(-a / period), 0, None)
+
+  return np.where(periodic, a - period * up + period * down, a)
+
+def box(a, periodic=True, period=PERIOD):
+  """Maps the periodic values onto 0 <= a < period"""
+
+  a = np.asarray(a, dtype=float)
+  boxed = np.mod(a, period)
+
+  # mod of a tiny negative number rounds up to period
+  boxed = np.where(boxed >= period, 0., boxed)
+
+  return np.where(periodic, boxed, a)
+
+#----------#
+# Geometry #
+#----------#
+
+def min_image(diff, periodic=True, period=PERIOD):
+  """Differences of the periodic values taken the short way around"""
+
+  return wrap(diff, periodic, period)
+
+def difference(x1, x2, periodic=True, period=PERIOD):
+  """x2 - x1, the short way around for the periodic values"""
+
+  return min_image(np.asarray(x2, dtype=float) - np.asarray(x1, dtype=float),
+                   periodic, period)
+
+def length(diff, periodic=True, period=PERIOD):
+  """Euclidean length over the last axis of (..., nvar) differences"""
+
+  diff = np.abs(min_image(diff, periodic, period))
+
+  return np.sqrt(np.sum(diff**2, axis=-1))
+
+def distance(x1, x2, periodic=True, period=PERIOD):
+  """Distance between points, the short way around the periodic values"""
+
+  return length(np.asarray(x2, dtype=float) - np.asarray(x1, dtype=float),
+                periodic, period)
+
+def interpolate(x1, x2, t, periodic=True, period=PERIOD):
+  """Points a fraction t of the way from x1 to x2, not wrapped
+
+     t may be an array, e.g. t[:, np.newaxis] for the points of a line."""
+
+  x1 = np.asarray(x1, dtype=float)
+
+  return x1 + np.asarray(t) * difference(x1, x2, periodic, period)
+
+def unwrap(path, periodic=True, period=PERIOD):
+  """Makes a (..., npoints, nvar) path continuous along its points
+
+     The first point is kept, every other point is the one before plus the
+     minimum image difference, so the path may leave the wrapped range.
+     Points are only shifted by whole periods, those on the same side of
+     the seam as the one before keep their exact values."""
+
+  path = np.asarray(path, dtype=float)
+  diff = np.diff(path, axis=-2)
+  shifts = min_image(diff, periodic, period) - diff
+
+  unwrapped = np.array(path)
+  unwrapped[..., 1:, :] += np.cumsum(np.round(shifts / period), axis=-2) * period
+
+  return unwrapped
@@ -0,0 +1,197 @@
+#!/usr/bin/python
+
+""" pmf_surface.py: The umbrella sampling PMF as a regular periodic grid
+
+      Usage: import pmf_surface
+             pmf = pmf_surface.read_pmf('alad_2d_pmf.dat')
+             energies = pmf.nearest(string)      # string is (nimg, 2)
+
+      Description: alad_2d_pmf.dat lists 'phi psi energy' for every bin
+                   center of a regular phi,psi grid (3 degree bins from
+                   -178.5 to 178.5). The file is loaded once into a 2D
+                   array and a point is looked up by index arithmetic
+                   instead of a scan over all bins, wrapping periodically
+                   at +-180. Lookups take arrays of points of any shape
+                   (..., 2) and return an array of shape (...).
+
+                   Between bin centers the surface is interpolated
+                   periodically, either bilinearly or bicubically
+                   (Catmull-Rom, C1 and exact at the bin centers), with
+                   analytical gradients in energy per degree:
+
+                     energy, grad = pmf.interpolate(points, 'bicubic')
+                                                                         """
+
+import numpy as np
+
+PERIOD = 360.
+MODES  = ('nearest', 'bilinear', 'bicubic')
+
+# Catmull-Rom basis: rows t^3, t^2, t, 1 (derivative: t^2, t, 1),
+# columns the offsets -1, 0, 1, 2
+_CATMULL_ROM = np.array([[-1.,  3., -3.,  1.],
+                         [ 2., -5.,  4., -1.],
+                         [-1.,  0.,  1.,  0.],
+                         [ 0.,  2.,  0.,  0.]]) / 2.
+_CATMULL_ROM_DT = np.array([[-3.,   9., -9.,  3.],
+                            [ 4., -10.,  8., -2.],
+                            [-1.,   0.,  1.,  0.]]) / 2.
+
+#------------------#
+# Helper Functions #
+#------------------#
+
+def _cubic_weights(t):
+  """Catmull-Rom weights of the offsets -1, 0, 1, 2 and their derivatives"""
+
+  # t^3, t^2, t, 1 against the basis matrices, one small matrix product
+  # per call so the many tiny calls of a dynamics run stay cheap
+  powers = np.asarray(t)[..., np.newaxis] ** np.arange(3, -1, -1)
+
+  return powers.dot(_CATMULL_ROM), powers[..., 1:].dot(_CATMULL_ROM_DT)
+
+def _grid_axis(values, fname):
+  """Returns the sorted bin centers of one grid axis and its spacing"""
+
+  axis = np.unique(values)
+  if axis.size < 2:
+    raise ValueError('%s: a grid axis needs at least two bins' % fname)
+
+  spacing = axis[1] - axis[0]
+  if not np.allclose(np.diff(axis), spacing):
+    raise ValueError('%s: the grid is not evenly spaced' % fname)
+  if not np.isclose(axis.size * spacing, PERIOD):
+    raise ValueError('%s: the grid does not cover %s degrees' % (fname, PERIOD))
+
+  return axis, spacing
+
+#-------------#
+# PMF surface #
+#-------------#
+
+class PMFSurface:
+  """Energies on a periodic phi,psi grid
+
+     values[i, j] is the energy at (origin[0] + i * spacing[0],
+     origin[1] + j * spacing[1])."""
+
+  def __init__(self, values, origin, spacing):
+
+    self.values  = np.asarray(values, dtype=float)
+    self.origin  = np.asarray(origin, dtype=float)
+    self.spacing = np.asarray(spacing, dtype=float)
+    self.shape   = self.values.shape
+
+  def index(self, points):
+    """Returns the (i, j) indices of the bins nearest to the points"""
+
+    points = np.asarray(points, dtype=float)
+    frac = (points - self.origin) / self.spacing
+
+    # Periodic wrap, bins past the last one fold back onto the first
+    i = np.round(frac[..., 0]).astype(int) % self.shape[0]
+    j = np.round(frac[..., 1]).astype(int) % self.shape[1]
+
+    return i, j
+
+  def nearest(self, points):
+    """Returns the energy of the bin nearest to each phi,psi point"""
+
+    i, j = self.index(points)
+
+    return self.values[i, j]
+
+  def _cell(self, points):
+    """Returns the lower-left bin and the fractional offsets of the points"""
+
+    points = np.asarray(points, dtype=float)
+    frac = (points - self.origin) / self.spacing
+    low = np.floor(frac)
+
+    return low.astype(int), frac - low
+
+  def bilinear(self, points):
+    """Returns the bilinear energy and gradient (..., 2) at the points"""
+
+    low, t = self._cell(points)
+    i0 = low[..., 0] % self.shape[0]
+    j0 = low[..., 1] % self.shape[1]
+    i1 = (i0 + 1) % self.shape[0]
+    j1 = (j0 + 1) % self.shape[1]
+    tx, ty = t[..., 0], t[..., 1]
+
+    f00 = self.values[i0, j0]
+    f10 = self.values[i1, j0]
+    f01 = self.values[i0, j1]
+    f11 = self.values[i1, j1]
+
+    energy = (1 - tx) * (1 - ty) * f00 + tx * (1 - ty) * f10 \
+           + (1 - tx) * ty * f01 + tx * ty * f11
+
+    grad = np.empty(energy.shape + (2,))
+    grad[..., 0] = ((1 - ty) * (f10 - f00) + ty * (f11 - f01)) / self.spacing[0]
+    grad[..., 1] = ((1 - tx) * (f01 - f00) + tx * (f11 - f10)) / self.spacing[1]
+
+    return energy, grad
+
+  def bicubic(self, points):
+    """Returns the bicubic energy and gradient (..., 2) at the points"""
+
+    low, t = self._cell(points)
+    offsets = np.arange(-1, 3)
+    ix = (low[..., 0, np.newaxis] + offsets) % self.shape[0]
+    iy = (low[..., 1, np.newaxis] + offsets) % self.shape[1]
+
+    # 4 x 4 neighborhood of every point
+    patch = self.values[ix[..., :, np.newaxis], iy[..., np.newaxis, :]]
+
+    wx, dwx = _cubic_weights(t[..., 0])
+    wy, dwy = _cubic_weights(t[..., 1])
+
+    energy = np.einsum('...a,...ab,...b->...', wx, patch, wy)
+    grad = np.empty(energy.shape + (2,))
+    grad[..., 0] = np.einsum('...a,...ab,...b->...', dwx, patch, wy) \
+                   / self.spacing[0]
+    grad[..., 1] = np.einsum('...a,...ab,...b->...', wx, patch, dwy) \
+                   / self.spacing[1]
+
+    return energy, grad
+
+  def interpolate(self, points, mode='bicubic'):
+    """Returns the interpolated energy and gradient at the points"""
+
+    if mode == 'bilinear':
+      return self.bilinear(points)
+    elif mode == 'bicubic':
+      return self.bicubic(points)
+
+    raise ValueError('unknown interpolation mode %r' % mode)
+
+  def energy(self, points, mode='nearest'):
+    """Returns the energy at the points: nearest bin or interpolated"""
+
+    if mode == 'nearest':
+      return self.nearest(points)
+
+    return self.interpolate(points, mode)[0]
+
+def read_pmf(fname):
+  """Loads a 'phi psi energy' grid file into a PMFSurface"""
+
+  data = np.loadtxt(fname)
+  if data.ndim != 2 or data.shape[1] < 3:
+    raise ValueError('%s: expected phi, psi and energy columns' % fname)
+
+  phi, phi_step = _grid_axis(data[:, 0], fname)
+  psi, psi_step = _grid_axis(data[:, 1], fname)
+  if data.shape[0] != phi.size * psi.size:
+    raise ValueError('%s: %s rows for a %s x %s grid'
+                     % (fname, data.shape[0], phi.size, psi.size))
+
+  # Place every row by index arithmetic, whatever the row order
+  i = np.round((data[:, 0] - phi[0]) / phi_step).astype(int)
+  j = np.round((data[:, 1] - psi[0]) / psi_step).astype(int)
+  values = np.zeros((phi.size, psi.size))
+  values[i, j] = data[:, 2]
+
+  return PMFSurface(values, (phi[0], psi[0]), (phi_step, psi_step))
@@ -0,0 +1,132 @@
+#!/usr/bin/python
+
+""" reparam.py: Vectorized reparametrization of the string
+
+      Usage: import reparam
+             new_string = reparam.reparametrize(pts, nimg)
+
+      Description: Redistributes the images of a string so that they are
+                   equidistant in arc length. The finite differences, the
+                   cumulative string length and the linear projection of
+                   every new image are computed as array operations over
+                   the whole (nimg, nvar) string at once; the links of all
+                   new images are found with a single np.searchsorted.
+
+                   Col vars are split into three blocks, as in the
+                   original string_reparam.py:
+                     j <  ang_var            - plain (non-periodic) vars
+                     ang_var <= j < uang_var - signed angles, -180 < a < 180
+                     j >= uang_var           - unsigned angles, 0 < a < 180
+                   Differences of every angle var use the minimum image,
+                   see pbc.py. The strings of the cycle are continuous paths
+                   and are reparametrized as they are, only the unsigned
+                   angles are folded back onto 0 < a < 180
+                   (fold_unsigned).
+
+                   Arc length is Euclidean unless a metric is given, one
+                   (nvar, nvar) tensor G per link: a link then has length
+                   sqrt(d.G.d), see metric_update.py.
+
+                   See string_reparam.py for the command line interface.
+                                                                         """
+
+import numpy as np
+import pbc
+
+ANG_VAR  = pbc.ANG_VAR           # Index from 0
+UANG_VAR = pbc.UANG_VAR
+
+#-------------------#
+# Reparametrization #
+#-------------------#
+
+def string_length(pts, ang_var=ANG_VAR, uang_var=UANG_VAR, metric=None):
+  """Returns the cumulative string length and the unit link vectors
+
+     pts may be a single string (nimg, nvar) or a stack of strings
+     (ncycles, nimg, nvar); the links run along the image axis. metric
+     holds the (..., nimg-1, nvar, nvar) tensors of the links."""
+
+  pts = np.asarray(pts, dtype=float)
+  angle = pbc.angle_masks(pts.shape[-1], ang_var, uang_var)[0]
+
+  # FD between img (n+1, n), minimum image for the angles
+  diff = pbc.min_image(np.diff(pts, axis=-2), angle)
+
+  if metric is None:
+    dist = np.sqrt(np.sum(diff**2, axis=-1))
+  else:
+    dist = np.sqrt(np.einsum('...i,...ij,...j->...', diff, metric, diff))
+
+  slength = np.zeros(pts.shape[:-1])
+  slength[..., 1:] = np.cumsum(dist, axis=-1)
+
+  # Repeated images give zero length links, they are never projected from
+  grad = np.zeros(diff.shape)
+  moved = dist > 0
+  grad[moved] = diff[moved] / dist[moved][:, np.newaxis]
+
+  return slength, grad
+
+def reparametrize(pts, nimg, ang_var=ANG_VAR, uang_var=UANG_VAR, metric=None):
+  """Projects nimg equidistant images onto the string pts (nimg_old, nvar)
+
+     The returned angles are not wrapped, they continue from the images
+     they are projected from."""
+
+  pts = np.asarray(pts, dtype=float)
+  if metric is not None:
+    metric = np.asarray(metric, dtype=float)[np.newaxis]
+
+  return reparametrize_batch(pts[np.newaxis], nimg, ang_var, uang_var, metric)[0]
+
+def reparametrize_batch(strings, nimg, ang_var=ANG_VAR, uang_var=UANG_VAR,
+                        metric=None):
+  """Reparametrizes a stack of strings (ncycles, nimg_old, nvar) at once
+
+     Returns an (ncycles, nimg, nvar) array, angles are not wrapped. The
+     link vectors are scaled to unit metric length, so the linear projection
+     of a new image is the same in any metric."""
+
+  strings = np.asarray(strings, dtype=float)
+  ncycles, nimg_old, nvar = strings.shape
+  slength, grad = string_length(strings, ang_var, uang_var, metric)
+
+  # Target arc length of every new image of every string
+  img_dist = slength[:, -1] / float(nimg - 1)
+  tot_dist = img_dist[:, np.newaxis] * np.arange(nimg)
+
+  # Offset each string's arc length past the end of the previous one so a
+  # single searchsorted over the flattened lengths finds every link
+  offset = np.zeros(ncycles)
+  offset[1:] = np.cumsum(slength[:-1, -1] + 1.)
+  flat = (slength + offset[:, np.newaxis]).ravel()
+  target = (tot_dist + offset[:, np.newaxis]).ravel()
+
+  # nth link of string for every new image at once
+  link = np.searchsorted(flat, target).reshape(ncycles, nimg)
+  link -= nimg_old * np.arange(ncycles)[:, np.newaxis] + 1
+  link = np.clip(link, 0, nimg_old - 2)
+
+  rows = np.arange(ncycles)[:, np.newaxis]
+  proj_dist = tot_dist - slength[rows, link]
+  new_strings = strings[rows, link] + grad[rows, link] * proj_dist[..., np.newaxis]
+
+  # First and last points, Project 0 distance.
+  #   Careful - Floating Point rounding errors
+  first = tot_dist == 0
+  last = (np.round(tot_dist, 5) == np.round(slength[:, -1:], 5)) & ~first
+  new_strings = np.where(first[..., np.newaxis], strings[:, :1], new_strings)
+  new_strings = np.where(last[..., np.newaxis], strings[:, -1:], new_strings)
+
+  return new_strings
+
+def fold_unsigned(string, ang_var=ANG_VAR, uang_var=UANG_VAR):
+  """Folds the unsigned angle vars of a string onto 0 < theta < 180 with
+     abs() of the wrapped angle, the other vars are kept as they are"""
+
+  string = np.array(string, dtype=float)
+  unsigned = pbc.angle_masks(string.shape[-1], ang_var, uang_var)[1]
+  string[..., unsigned] = np.abs(pbc.wrap(string[..., unsigned]))
+
+  return string
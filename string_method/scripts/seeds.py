@@ -0,0 +1,144 @@
+#!/usr/bin/python
+
+""" seeds.py: Reproducible random streams of a string method run
+
+      Usage: import seeds
+             root = seeds.root_seed()
+             isee = seeds.charmm_seeds(root, cycle, image, attempt)
+             rng = seeds.random_state(root, 'push', cycle)
+
+             python seeds.py <cycle> <image> [attempts]
+
+      Description: Every random number of a run derives from a single root
+                   seed. The stream of a (purpose, cycle, image, attempt) is
+                   the SHA-256 hash of those counters and the root seed, so
+                   any stream can be regenerated on its own, in any order
+                   and in any process, without replaying the draws before
+                   it:
+
+                     charmm_seeds - isee1..isee4 of the CHARMM job of an
+                                    image, see charmm_job.py; re-runs after
+                                    an ABNORMAL termination count the
+                                    attempt up from 0
+                     random_state - a numpy RandomState, e.g. for the push
+                                    of a cycle, see string_cycle.py
+
+                   Re-running a cycle with the same root seed repeats its
+                   CHARMM seeds and push exactly, so a failed cycle can be
+                   replayed without restarting the string.
+
+                   The root seed is read from the STRING_SEED environment
+                   variable, else from root_seed.dat in the run directory.
+                   If neither exists, a new seed is drawn from os.urandom
+                   and saved to root_seed.dat, which gen-bsub-cyc.py and
+                   local-cyc.py do before any job starts. existing_seed
+                   only reads a seed, for the standalone tools that must
+                   not leave a root_seed.dat behind.
+
+      Input: cycle - the iteration of the string method
+             image - the image number
+             attempts - the number of attempts to list (default 1)
+
+      Output: The isee1..isee4 of each attempt of the CHARMM job of an image
+                                                                         """
+
+import hashlib, os, struct, sys
+import numpy as np
+
+SEED_FILE = 'root_seed.dat'
+SEED_ENV  = 'STRING_SEED'
+ISEE_MIN  = 100         # range of the CHARMM seeds, as drawn before
+ISEE_MAX  = 1000000
+
+#-----------#
+# Root Seed #
+#-----------#
+
+def new_seed():
+  """A fresh 63 bit root seed from the operating system"""
+
+  return struct.unpack('<Q', os.urandom(8))[0] >> 1
+
+def existing_seed(fname=SEED_FILE):
+  """The root seed of the run if one is set, None otherwise; never saves
+     one"""
+
+  if SEED_ENV in os.environ:
+    return int(os.environ[SEED_ENV])
+
+  if not os.path.exists(fname):
+    return None
+
+  sfile = open(fname)
+  seed = int(sfile.read().split()[0])
+  sfile.close()
+
+  return seed
+
+def root_seed(fname=SEED_FILE):
+  """The root seed of the run, created and saved if there is none"""
+
+  if SEED_ENV in os.environ:
+    return int(os.environ[SEED_ENV])
+
+  if not os.path.exists(fname):
+    tmp = '%s.%s.tmp' % (fname, os.getpid())
+    sfile = open(tmp, 'w')
+    sfile.write('%d\n' % new_seed())
+    sfile.close()
+
+    # link fails if another job saved one first, that one is the seed
+    try:
+      os.link(tmp, fname)
+    except OSError:
+      pass
+    os.remove(tmp)
+
+  return existing_seed(fname)
+
+#---------#
+# Streams #
+#---------#
+
+def stream_key(root, purpose, cycle, image=0, attempt=0):
+  """The 32 byte key of one stream"""
+
+  counters = '%d:%s:%d:%d:%d' % (root, purpose, cycle, image, attempt)
+
+  return hashlib.sha256(counters.encode()).digest()
+
+def stream_words(root, purpose, cycle, image=0, attempt=0):
+  """The key of a stream as 8 unsigned 32 bit words"""
+
+  return np.frombuffer(stream_key(root, purpose, cycle, image, attempt),
+                       dtype='<u4')
+
+def random_state(root, purpose, cycle, image=0, attempt=0):
+  """A numpy RandomState seeded with the key of a stream"""
+
+  return np.random.RandomState(stream_words(root, purpose, cycle, image,
+                                            attempt))
+
+def charmm_seeds(root, cycle, image, attempt=0):
+  """isee1..isee4 of an attempt of the CHARMM job of an image"""
+
+  words = stream_words(root, 'charmm', cycle, image, attempt)[:4]
+
+  return [ISEE_MIN + int(word) % (ISEE_MAX - ISEE_MIN + 1) for word in words]
+
+#--------#
+#  MAIN  #
+#--------#
+
+if __name__ == '__main__':
+
+  cycle = int(sys.argv[1])
+  image = int(sys.argv[2])
+  attempts = 1
+  if len(sys.argv) > 3:
+    attempts = int(sys.argv[3])
+
+  root = root_seed()
+  for attempt in range(attempts):
+    print('attempt %s: isee1=%s isee2=%s isee3=%s isee4=%s'
+          % tuple([attempt] + charmm_seeds(root, cycle, image, attempt)))
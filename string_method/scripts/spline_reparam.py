@@ -0,0 +1,256 @@
+#!/usr/bin/python
+
+""" spline_reparam.py: Cubic spline reparametrization with adaptive spacing
+
+      Usage: import spline_reparam
+             new_string = spline_reparam.reparametrize(string, nimg)
+             spacing = spline_reparam.Spacing('energy', 'alad_2d_pmf.dat')
+             new_string = spacing.reparametrize(string, nimg)
+
+             python spline_reparam.py <nvar> <nimg> <fname> [density] [pmf_file] [periodic]
+
+      Description: reparam.py projects the new images onto the straight
+                   links between the old ones and spaces them equally.
+                   Here a natural cubic spline is fitted through the
+                   images, parametrized by their chord length, and the new
+                   images are placed on the curve with a density along
+                   its arc length:
+
+                     uniform   - equal arc length, as reparam.py but on
+                                 the spline
+                     energy    - 1 + strength * (E - Emin) / (Emax - Emin)
+                     curvature - 1 + strength * |E''| / max |E''|, E''
+                                 the second derivative of E along the
+                                 string
+
+                   E is the umbrella sampling PMF of pmf_surface.py,
+                   interpolated bicubically along the curve, so phi,psi
+                   strings only. With the default strength the images are
+                   up to STRENGTH + 1 times denser at the barrier than in
+                   the basins, and fewer images resolve the transition
+                   state.
+
+                   Periodic col vars are unwrapped from image 0 before the
+                   fit (see pbc.py), so a string crossing the +-180 seam
+                   is fitted as one smooth curve, and the new images are
+                   continuous from image 0 as in string_cycle.py. Repeated
+                   images are dropped from the fit. The spline is solved
+                   for all col vars in one tridiagonal sweep, O(nimg), and
+                   the curve is sampled SAMPLES times per link in a single
+                   evaluation; the new images are found on the samples by
+                   np.interp.
+
+                   The first and last images are kept as they are. Used
+                   by string_cycle.py with a Spacing given.
+
+      Input: nvar - the number of col vars
+             nimg - the number of images in the new string
+             fname - the string file to reparametrize
+             density - uniform (default), energy or curvature
+             pmf_file - the PMF grid of the density, alad_2d_pmf.dat
+             periodic - one 0/1 flag per col var, e.g. 11 for phi,psi
+
+      Output: The reparametrized string, on stdout
+                                                                         """
+
+import sys
+import numpy as np
+import pbc, pmf_surface, reparam, string_io
+
+DENSITIES = ('uniform', 'energy', 'curvature')
+PMF_FILE  = 'alad_2d_pmf.dat'
+SAMPLES   = 32      # points of the curve per link of the old string
+STRENGTH  = 3.      # densest over sparsest images, minus one
+MODE      = 'bicubic'
+
+#--------#
+# Spline #
+#--------#
+
+def chord_parameter(string):
+  """Drops repeated images, returns the images left and their cumulative
+     chord length"""
+
+  links = np.sqrt(np.sum(np.diff(string, axis=0)**2, axis=1))
+  keep = np.concatenate([[True], links > 0])
+  if not keep[-1]:
+    # the last image is fixed, drop the copy before it instead
+    keep[np.nonzero(keep)[0][-1]] = False
+    keep[-1] = True
+
+  string = string[keep]
+  param = np.zeros(len(string))
+  param[1:] = np.cumsum(np.sqrt(np.sum(np.diff(string, axis=0)**2, axis=1)))
+
+  return string, param
+
+def natural_spline(param, string):
+  """Second derivatives (nimg, nvar) of the natural cubic spline through
+     the images at the parameters"""
+
+  nimg = len(param)
+  second = np.zeros(string.shape)
+  if nimg < 3:
+    return second
+
+  h = np.diff(param)
+  slope = np.diff(string, axis=0) / h[:, np.newaxis]
+
+  # tridiagonal system of the inner images, solved by the Thomas
+  # algorithm, all col vars at once
+  diag = 2. * (h[:-1] + h[1:])
+  rhs = 6. * np.diff(slope, axis=0)
+  for i in range(1, len(diag)):
+    factor = h[i] / diag[i - 1]
+    diag[i] -= factor * h[i]
+    rhs[i] -= factor * rhs[i - 1]
+
+  inner = second[1:-1]
+  inner[-1] = rhs[-1] / diag[-1]
+  for i in range(len(diag) - 2, -1, -1):
+    inner[i] = (rhs[i] - h[i + 1] * inner[i + 1]) / diag[i]
+
+  return second
+
+def evaluate(param, string, second, points):
+  """The spline at the parameter points, (npoints, nvar)"""
+
+  link = np.clip(np.searchsorted(param, points) - 1, 0, len(param) - 2)
+  h = (param[link + 1] - param[link])[:, np.newaxis]
+  b = (points - param[link])[:, np.newaxis] / h
+  a = 1. - b
+
+  return a * string[link] + b * string[link + 1] \
+         + ((a**3 - a) * second[link] + (b**3 - b) * second[link + 1]) * h**2 / 6.
+
+def sample(param, string, second, samples=SAMPLES):
+  """Parameters, points and cumulative arc length of the curve, sampled
+     samples times per link"""
+
+  steps = np.linspace(0., 1., samples + 1)[:-1]
+  points = (param[:-1, np.newaxis] + np.diff(param)[:, np.newaxis] * steps).ravel()
+  points = np.append(points, param[-1])
+
+  curve = evaluate(param, string, second, points)
+  arc = np.zeros(len(points))
+  arc[1:] = np.cumsum(np.sqrt(np.sum(np.diff(curve, axis=0)**2, axis=1)))
+
+  return points, curve, arc
+
+#---------#
+# Density #
+#---------#
+
+def pmf_weights(pmf, curve, arc, density, strength=STRENGTH):
+  """Image density at the samples of a phi,psi curve from the PMF"""
+
+  if curve.shape[1] != 2:
+    raise ValueError('the %s density needs phi,psi strings, not %s col vars'
+                     % (density, curve.shape[1]))
+
+  energy, grad = pmf.interpolate(curve, MODE)
+  if density == 'energy':
+    profile = energy - energy.min()
+  else:
+    # dE/ds from the PMF gradient along the curve, then d/ds of that
+    tangent = np.gradient(curve, axis=0) / np.gradient(arc)[:, np.newaxis]
+    profile = np.abs(np.gradient(np.sum(grad * tangent, axis=1), arc))
+
+  if profile.max() > 0:
+    profile = profile / profile.max()
+
+  return 1. + strength * profile
+
+def redistribute(arc, weights, nimg):
+  """Arc lengths of nimg images spaced equally in the weighted arc length"""
+
+  # trapezoid rule, the weighted length runs from 0 to total
+  weighted = np.zeros(len(arc))
+  weighted[1:] = np.cumsum(0.5 * (weights[1:] + weights[:-1]) * np.diff(arc))
+  targets = np.linspace(0., weighted[-1], nimg)
+
+  return np.interp(targets, weighted, arc)
+
+#-------------------#
+# Reparametrization #
+#-------------------#
+
+def reparametrize(string, nimg, density='uniform', pmf=None, strength=STRENGTH,
+                  periodic=None):
+  """Places nimg images on the cubic spline through the (nimg_old, nvar)
+     string, with the density of the PMF surface pmf unless uniform"""
+
+  if density not in DENSITIES:
+    raise ValueError('unknown density %s, one of %s'
+                     % (density, ', '.join(DENSITIES)))
+
+  string = np.asarray(string, dtype=float)
+  if periodic is None:
+    periodic = pbc.angle_masks(string.shape[1])[0]
+  string = pbc.unwrap(string, periodic)
+
+  images, param = chord_parameter(string)
+  if len(images) < 2:
+    return np.repeat(string[:1], nimg, axis=0)
+
+  second = natural_spline(param, images)
+  points, curve, arc = sample(param, images, second)
+
+  weights = np.ones(len(arc))
+  if density != 'uniform':
+    weights = pmf_weights(pmf, curve, arc, density, strength)
+
+  # parameter of every new image, then the spline there
+  new_points = np.interp(redistribute(arc, weights, nimg), arc, points)
+  new_string = evaluate(param, images, second, new_points)
+  new_string[0], new_string[-1] = string[0], string[-1]
+
+  return new_string
+
+class Spacing:
+  """A density of the images for the reparametrizations of a run"""
+
+  def __init__(self, density='uniform', pmf_file=PMF_FILE, strength=STRENGTH,
+               periodic=None):
+
+    if density not in DENSITIES:
+      raise ValueError('unknown density %s, one of %s'
+                       % (density, ', '.join(DENSITIES)))
+
+    self.density = density
+    self.strength = strength
+    self.periodic = periodic
+    self.pmf = None
+    if density != 'uniform':
+      self.pmf = pmf_surface.read_pmf(pmf_file)
+
+  def reparametrize(self, string, nimg):
+    """Reparametrizes a string to nimg images with this density"""
+
+    return reparametrize(string, nimg, self.density, self.pmf, self.strength,
+                         self.periodic)
+
+#--------#
+#  MAIN  #
+#--------#
+
+if __name__ == '__main__':
+
+  nvar    = int(sys.argv[1])
+  nimg    = int(sys.argv[2])
+  fname   = sys.argv[3]
+  density = 'uniform'
+  pmf_file = PMF_FILE
+  periodic = None
+  if len(sys.argv) > 4:
+    density = sys.argv[4]
+  if len(sys.argv) > 5:
+    pmf_file = sys.argv[5]
+  if len(sys.argv) > 6:
+    periodic = [flag == '1' for flag in sys.argv[6]]
+
+  spacing = Spacing(density, pmf_file, periodic=periodic)
+  new_string = spacing.reparametrize(string_io.read_string(fname, nvar), nimg)
+
+  # Angles continue from image 0, see pbc.py; unsigned are 0 < theta < 180
+  string_io.print_string(reparam.fold_unsigned(new_string))
@@ -0,0 +1,166 @@
+#!/usr/bin/python
+
+""" string_archive.py: Binary archive of a run's string_<cycle>.dat history
+
+      Usage: python string_archive.py <nvars> <dat_dir> <archive> [prefix] [periodic]
+
+      Description: Packs every <prefix><cycle>.dat file of a run (default
+                   prefix string_) into a single binary file so analysis
+                   tools no longer re-parse the '# Image n' text files. The
+                   archive is read back through a memory map, so slicing one
+                   cycle, or one image across all cycles, only touches the
+                   bytes of that slice.
+
+                   The number of images may change between cycles (see
+                   string_cycle.image_count), so the strings are stored
+                   back to back, each with its own count, and an offsets
+                   array gives the first row of every cycle.
+
+                   Layout (little endian):
+                     8 bytes      magic 'STRARC02'
+                     4 x int64    ncycles, nrows, nvars, data offset
+                     nvars uint8  periodic-variable mask
+                     ncycles int64  cycle numbers
+                     ncycles+1 int64  row offsets, cycle i is rows
+                                      offsets[i]:offsets[i+1]
+                     zero padding up to the data offset (64 byte aligned)
+                     float64      data block [nrows, nvars]
+
+      Input: nvars - the number of collective variables
+             dat_dir - the directory holding the string files of the run
+             archive - the archive file to write
+             prefix - the prefix of the string files (default string_)
+             periodic - one 0/1 flag per col var, e.g. 11 for phi,psi
+                        (default: the angle col vars of pbc.py)
+
+      Output: archive - the binary run archive
+                                                                         """
+
+import struct, sys
+import numpy as np
+import pbc, string_io
+
+MAGIC  = b'STRARC02'
+HEADER = '<4q'
+ALIGN  = 64
+
+#------------------#
+# Helper Functions #
+#------------------#
+
+def _data_offset(ncycles, nvars):
+  """Returns the 64 byte aligned start of the data block"""
+
+  size = len(MAGIC) + struct.calcsize(HEADER) + nvars + 8 * (2 * ncycles + 1)
+
+  return ((size + ALIGN - 1) // ALIGN) * ALIGN
+
+def write_archive(fname, cycles, strings, periodic=None):
+  """Writes a list of (nimages, nvars) strings, nimages may differ between
+     them, to an archive"""
+
+  strings = [np.asarray(string, dtype='<f8') for string in strings]
+  ncycles = len(strings)
+  if len(cycles) != ncycles:
+    raise ValueError('%s cycle numbers for %s strings' % (len(cycles), ncycles))
+
+  nvars = strings[0].shape[1]
+  if set([string.shape[1] for string in strings]) != set([nvars]):
+    raise ValueError('strings with different numbers of col vars')
+
+  rows = np.zeros(ncycles + 1, dtype='<i8')
+  rows[1:] = np.cumsum([len(string) for string in strings])
+
+  if periodic is None:
+    periodic = pbc.angle_masks(nvars)[0]
+  periodic = np.asarray(periodic, dtype='u1')
+  offset = _data_offset(ncycles, nvars)
+
+  header = MAGIC + struct.pack(HEADER, ncycles, rows[-1], nvars, offset) \
+         + periodic.tobytes() + np.asarray(cycles, dtype='<i8').tobytes() \
+         + rows.tobytes()
+
+  archive = open(fname, 'wb')
+  archive.write(header + b'\0' * (offset - len(header)))
+  archive.write(np.concatenate(strings).tobytes())
+  archive.close()
+
+def convert_run(dat_dir, fname, nvars, prefix='string_', periodic=None):
+  """Packs the <prefix><cycle>.dat files of dat_dir into an archive"""
+
+  cycles, strings = string_io.read_run(dat_dir, nvars, prefix)
+  if not cycles:
+    raise ValueError('no %s<cycle>.dat files in %s' % (prefix, dat_dir))
+
+  write_archive(fname, cycles, strings, periodic)
+
+#---------#
+# Reading #
+#---------#
+
+class StringArchive:
+  """Memory-mapped view of a run archive
+
+     archive.data is the (nrows, nvars) block of every image of every
+     cycle, archive.nimages the number of images of each cycle; nothing is
+     read from disk until it is sliced."""
+
+  def __init__(self, fname):
+
+    archive = open(fname, 'rb')
+    magic = archive.read(len(MAGIC))
+    if magic != MAGIC:
+      archive.close()
+      raise ValueError('%s is not a string archive' % fname)
+
+    ncycles, nrows, nvars, offset = struct.unpack(
+      HEADER, archive.read(struct.calcsize(HEADER)))
+    self.periodic = np.frombuffer(archive.read(nvars), dtype='u1') > 0
+    self.cycles = np.frombuffer(archive.read(8 * ncycles), dtype='<i8')
+    self.offsets = np.frombuffer(archive.read(8 * (ncycles + 1)), dtype='<i8')
+    archive.close()
+
+    self.fname   = fname
+    self.nvars   = nvars
+    self.nimages = np.diff(self.offsets)
+    self.data    = np.memmap(fname, dtype='<f8', mode='r', offset=offset,
+                             shape=(nrows, nvars))
+
+    # cycle number -> index of the cycle
+    self._rows = dict(zip(self.cycles.tolist(), range(ncycles)))
+
+  def __len__(self):
+    return len(self.cycles)
+
+  def cycle(self, cycle):
+    """Returns the (nimages, nvars) string of a cycle number"""
+
+    row = self._rows[cycle]
+
+    return self.data[self.offsets[row]:self.offsets[row + 1]]
+
+  def image(self, image):
+    """Returns the history of one image over the cycles that have it, and
+       the numbers of those cycles"""
+
+    held = self.nimages > image
+
+    return self.data[self.offsets[:-1][held] + image], self.cycles[held]
+
+#--------#
+#  MAIN  #
+#--------#
+
+if __name__ == '__main__':
+
+  nvars   = int(sys.argv[1])
+  dat_dir = sys.argv[2]
+  fname   = sys.argv[3]
+  prefix  = 'string_'
+  periodic = None
+  if len(sys.argv) > 4:
+    prefix = sys.argv[4]
+  if len(sys.argv) > 5:
+    periodic = [flag == '1' for flag in sys.argv[5]]
+
+  convert_run(dat_dir, fname, nvars, prefix, periodic)
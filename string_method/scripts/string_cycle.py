@@ -0,0 +1,314 @@
+#!/usr/bin/python
+
+""" string_cycle.py: The end of cycle string update, run in a single process
+
+      Usage: python string_cycle.py <nvars> <nimages> <cycle> <ntraj> [push] [persist] [metric] [periodic]
+
+      Description: Runs the serial section of manage_image_last.py once all
+                   images of a cycle are done, as functions on in-memory
+                   (nimages, nvars) arrays instead of a chain of scripts that
+                   re-read each other's text files:
+
+                     pushed   - get_pstring.py, the strings after the push
+                     unparam  - compute_string.py, the swarm averages
+                                reparametrize (string_reparam.py)
+                     normal   - push_string.py, simulated annealing push
+                                reparametrize
+                     nn       - calc_nearest_neighbors_inc_num.py, only on
+                                the optimization cycles (or another knot
+                                removal of nearest_neighbors.py), skipped
+                                when knot_detector.py finds no tangled
+                                images
+                                reparametrize
+                     streams  - gen-img-stream.py, for the next cycle
+
+                   The push and nearest-neighbor stages only run with push
+                   set to 1. With persist set to 1 (default), the
+                   intermediate strings are written to
+                   string_<stage>_<cycle>.dat as the scripts above do. The
+                   final string_<cycle>.dat is written last, after the stream
+                   files, and renamed into place since the next cycle waits
+                   for it.
+
+                   With metric set to 1, the unparam stage is the metric
+                   update of metric_update.py: the images move by their
+                   weighted swarm drift, and every reparametrization of the
+                   cycle spaces them equally in the metric of the swarm
+                   covariances.
+
+                   With a spline_reparam.Spacing given (and no metric),
+                   the reparametrizations place the images on a cubic spline
+                   through the string instead of its straight links, with
+                   a uniform density or one from the PMF that crowds them
+                   at the barrier (see spline_reparam.py).
+
+                   The strings of a cycle are continuous paths: the
+                   pushed and unparam strings are unwrapped from image 0
+                   over the periodic col vars (see pbc.py), and so is the
+                   string left by the knot removal, which may visit the
+                   images out of order. A string that crosses the +-180
+                   seam keeps going past it through every stage and into
+                   string_<cycle>.dat; only the .str targets are wrapped.
+
+                   The number of images may change from one cycle to the
+                   next, e.g. few images while the path is coarse and more
+                   once it settles: image_count reads the count of a cycle
+                   from a refine table {first cycle: nimages}, and run_cycle
+                   reparametrizes the new string to new_nimages images.
+                   write_cycle then sets up the images of the next cycle
+                   before its stream files: the stop image's
+                   img_<img>_cycle_1.var is copied to its new number, and
+                   every evolved image starts from the .cor of the nearest
+                   image of this cycle in col var space, found with a
+                   NeighborIndex (see neighbor_index.py) on the pushed
+                   string. With the same count, image <img> keeps starting
+                   from its own .cor.
+
+      Input: nvars - the number of col vars
+             nimages - the number of images
+             cycle - the iteration of the string method
+             ntraj - the number of trajectories in the swarm
+             push - 1 to push the string and remove knots (default 0)
+             persist - 1 to write the intermediate strings (default 1)
+             metric - 1 for the swarm covariance metric update (default 0)
+             periodic - one 0/1 flag per col var, e.g. 11 for phi,psi
+                        (default: the angle col vars of pbc.py)
+
+      Output: string_<cycle>.dat - the reparametrized string
+              img_<img>_cycle_<cycle>.str - stream files for the next cycle
+              img_<img>_cycle_<cycle>.cor - the start of the next cycle's
+                                            images, when the count changes
+              string_<stage>_<cycle>.dat - the intermediate strings
+              swarm_summary_<cycle>.npz - see swarm_analysis.py
+                                                                         """
+
+import os, shutil, sys
+import compute_string, file_events, get_pstring, knot_detector, \
+       metric_update, nearest_neighbors, neighbor_index, pbc, reparam, seeds, \
+       string_io, string_push, swarm_analysis, swarm_store
+
+#--------------#
+# Image counts #
+#--------------#
+
+def image_count(cycle, nimages, refine=None):
+  """The number of images of a cycle: the refine entry {first cycle:
+     nimages} at or before the cycle, nimages if there is none
+
+     Cycle 1 runs the nimages images set up for the run, the images of a
+     refined cycle are seeded at the end of the one before, so every first
+     cycle is after cycle 1."""
+
+  early = sorted([first for first in (refine or {}) if first <= 1])
+  if early:
+    raise ValueError('refine table starts at cycle %s, the first cycle it '
+                     'can change the number of images of is 2' % early[0])
+
+  firsts = [first for first in (refine or {}) if first <= cycle]
+  if not firsts:
+    return nimages
+
+  return refine[max(firsts)]
+
+def seed_images(string, pushed, cycle, periodic=None):
+  """Sets up the images of the next cycle for a new string with another
+     number of images than the pushed string of this cycle"""
+
+  # the end points never move, only their number changes
+  stop = len(string) - 1
+  if not os.path.exists('img_%s_cycle_1.var' %stop):
+    shutil.copy('img_%s_cycle_1.var' %(len(pushed) - 1),
+                'img_%s_cycle_1.var' %stop)
+
+  # nearest evolved image of this cycle, its .cor is where the CHARMM job
+  # left it
+  index = neighbor_index.NeighborIndex(pushed[1:-1], periodic)
+  sources = [index.nearest_to(image) + 1 for image in string[1:-1]]
+
+  # the backend has to leave the .cor of every image, see charmm_job.py
+  missing = ['img_%s_cycle_%s.cor' %(src, cycle) for src in sorted(set(sources))
+             if not os.path.exists('img_%s_cycle_%s.cor' %(src, cycle))]
+  if missing:
+    raise IOError('can not seed the %s images of cycle %s, missing %s'
+                  % (len(string), cycle + 1, ', '.join(missing)))
+
+  # every source is read before any .cor is replaced
+  for img, src in enumerate(sources, 1):
+    shutil.copy('img_%s_cycle_%s.cor' %(src, cycle),
+                'img_%s_cycle_%s.cor.tmp' %(img, cycle))
+  for img in range(1, len(string) - 1):
+    os.rename('img_%s_cycle_%s.cor.tmp' %(img, cycle),
+              'img_%s_cycle_%s.cor' %(img, cycle))
+
+  return sources
+
+#--------#
+# Stages #
+#--------#
+
+def reparametrize(string, nimages, summary=None, spacing=None):
+  """Reparametrizes a string to nimages equidistant images, in the metric of
+     the swarm summary if one is given, else on the spline of a
+     spline_reparam.Spacing if one is given"""
+
+  if summary is not None:
+    return metric_update.reparametrize(string, nimages, summary)
+
+  if spacing is not None:
+    new_string = spacing.reparametrize(string, nimages)
+  else:
+    new_string = reparam.reparametrize(string, nimages)
+
+  # Angles continue from image 0, unsigned are 0 < theta < 180
+  return reparam.fold_unsigned(new_string)
+
+def run_cycle(nvars, nimages, cycle, ntraj, push=False, schedule=None,
+              persist=True, periodic=None, metric=False, root=None,
+              knots='inc_num', spacing=None, new_nimages=None):
+  """Returns the new string of a cycle and its intermediate stages
+
+     The stages are (name, string) pairs in the order they were computed.
+     periodic is the mask of the col vars averaged as angles, see
+     compute_string.py, and unwrapped along the string, see pbc.py. metric
+     selects the update of metric_update.py. schedule is the
+     annealing.Schedule of the push and the knot removal, the default
+     cosine one if None. root is the root seed of the push, see seeds.py.
+     knots names the knot removal, one of nearest_neighbors.WALKS. spacing
+     is the spline_reparam.Spacing of the reparametrizations, the straight
+     links if None. new_nimages is the number of images of the new string,
+     nimages if None."""
+
+  periodic = compute_string.periodic_mask(nvars, periodic)
+
+  # the swarms are read once, for the string and for the summary
+  swarms = compute_string.get_swarms(nvars, nimages, cycle, ntraj)
+  stages = [('pushed', get_pstring.get_pstring(nimages, cycle)),
+            ('unparam', compute_string.get_string(nvars, nimages, cycle, ntraj,
+                                                  periodic, swarms))]
+  pushed = stages[0][1]
+
+  summary = None
+  if metric:
+    summary = swarm_analysis.analyze_cycle(nvars, nimages, cycle, ntraj,
+                                           periodic, swarms, pushed)
+    stages[-1] = ('unparam', metric_update.update_string(stages[-1][1], summary))
+
+  # continuous from image 0 across the +-180 seam
+  stages = [(name, pbc.unwrap(stage, periodic)) for name, stage in stages]
+  string = reparametrize(stages[-1][1], nimages, summary, spacing)
+
+  if push:
+    # one table for the push and the knot removal
+    schedule = string_push.get_schedule(cycle, schedule)
+    if root is None:
+      root = seeds.root_seed()
+    rng = seeds.random_state(root, 'push', cycle)
+    stages.append(('normal', string_push.push_string(string, cycle, schedule,
+                                                     rng=rng)))
+    string = reparametrize(stages[-1][1], nimages, summary, spacing)
+
+    # a clean string goes through the knot removal unchanged
+    if string_push.calc_nn(cycle, schedule):
+      report = knot_detector.detect(string, periodic, knots)
+      print(knot_detector.format_report(report, cycle))
+
+      if report['spans']:
+        stages.append(('nn', pbc.unwrap(nearest_neighbors.remove_knots(
+          string, periodic, nearest_neighbors.WALKS[knots]), periodic)))
+        string = reparametrize(stages[-1][1], nimages, summary, spacing)
+
+  # the images of the next cycle
+  if new_nimages is not None and new_nimages != nimages:
+    string = reparametrize(string, new_nimages, summary, spacing)
+
+  if persist:
+    # Keep a copy of the fixed images' swarm with the others
+    for img in (0, nimages-1):
+      shutil.copy('img_%s_cycle_1.var' %img, 'img_%s_cycle_%s.swm0' %(img, cycle))
+      if swarm_store.exists(cycle):
+        swarm_store.append_image(cycle, img, nvars)
+
+    for name, stage in stages:
+      string_io.write_string('string_%s_%s.dat' %(name, cycle), stage)
+
+    # Drift, covariance and sample size of the swarms
+    if summary is None:
+      summary = swarm_analysis.analyze_cycle(nvars, nimages, cycle, ntraj,
+                                             periodic, swarms, pushed)
+    swarm_analysis.write_summary(swarm_analysis.summary_file(cycle), summary)
+
+  return string, stages
+
+def write_cycle(string, cycle, pushed=None, periodic=None):
+  """Writes the stream files of the evolved images, then string_<cycle>.dat
+
+     With the pushed string of the cycle given and another number of images
+     in string, the images of the next cycle are set up first, see
+     seed_images."""
+
+  nimages = len(string)
+  if pushed is not None and len(pushed) != nimages:
+    seed_images(string, pushed, cycle, periodic)
+
+  for img in range(1, nimages - 1):
+    string_io.write_stream('img_%s_cycle_%s.str' %(img, cycle), string[img])
+
+  # complete before anyone sees it
+  string_io.write_string('string_%s.dat.tmp' %cycle, string)
+  file_events.publish('string_%s.dat.tmp' %cycle, 'string_%s.dat' %cycle)
+
+def clean_up(cycle):
+  """Removes the scratch files of a cycle and files away the previous one"""
+
+  prev = cycle-1
+
+  os.system('/bin/rm img_*_cycle_%s.dcd' % cycle)
+  os.system('/bin/rm img_*_cycle_%s_pushed.var' %cycle)
+  os.system('/bin/rm img_*_cycle_%s.done' %cycle)
+
+  os.system('mv img_*_cycle_%s.cor 0cor/' % prev)
+  os.system('mv img_*_cycle_%s.str 0str/' % prev)
+  os.system('mv string_%s.dat 0dat/' %prev)
+
+  os.system('mv img_*_cycle_%s.out 0out/' % cycle)
+  os.system('mv img_*_cycle_%s.swm* 0swm/' % cycle)
+  swarm_store.merge(cycle)
+  os.system('mv %s 0swm/' % swarm_store.store_file(cycle))
+  os.system('mv %s 0swm/' % swarm_analysis.summary_file(cycle))
+
+  # These files aren't generated in cycle 1.
+  if prev > 1:
+    os.system('mv string_unparam_%s.dat 0dat/' % prev)
+    os.system('mv string_pushed_%s.dat 0dat/' % prev)
+    # files from the modifications to the algorithm
+    if os.path.isfile('string_normal_%s.dat' % prev):
+      os.system('mv string_normal_%s.dat 0dat/' % prev)
+    if os.path.isfile('string_nn_%s.dat' % prev):
+      os.system('mv string_nn_%s.dat 0dat/' % prev)
+
+#--------#
+#  MAIN  #
+#--------#
+
+if __name__ == '__main__':
+
+  nvars   = int(sys.argv[1])
+  nimages = int(sys.argv[2])
+  cycle   = int(sys.argv[3])
+  ntraj   = int(sys.argv[4])
+  push    = False
+  persist = True
+  metric  = False
+  periodic = None
+  if len(sys.argv) > 5:
+    push = bool(int(sys.argv[5]))
+  if len(sys.argv) > 6:
+    persist = bool(int(sys.argv[6]))
+  if len(sys.argv) > 7:
+    metric = bool(int(sys.argv[7]))
+  if len(sys.argv) > 8:
+    periodic = [flag == '1' for flag in sys.argv[8]]
+
+  string, stages = run_cycle(nvars, nimages, cycle, ntraj, push,
+                             persist=persist, periodic=periodic, metric=metric)
+  write_cycle(string, cycle)
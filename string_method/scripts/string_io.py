@@ -0,0 +1,199 @@
+#!/usr/bin/python
+
+""" string_io.py: Shared reader/writer for the string method text files
+
+      Usage: import string_io
+             string = string_io.read_string('string_<cycle>.dat', nvars)
+             string_io.write_string('string_<cycle>.dat', string)
+
+      Description: A string_<cycle>.dat file holds one col var per line
+                   after an '# Image n' header for every image:
+
+                     # Image 0
+                     phi
+                     psi
+                     # Image 1
+                     ...
+
+                   The whole file is converted to floats in a single bulk
+                   numpy call and returned as an (nimages, nvars) array,
+                   and the image count is checked against the headers. A
+                   token that is not a number is a ValueError naming the
+                   file, never a string cut short.
+                   Strings are written back with a single buffered write.
+
+                   .var and .swm files (plain col vars, no headers) are
+                   read with read_var. The img_<img>_cycle_<cycle>.str
+                   restraint stream files for run_string.inp are written
+                   with write_stream and read back with read_stream.
+
+                   The strings of the pipeline are continuous paths that may
+                   run past +-180 (see pbc.py); the .str files are where
+                   they reach CHARMM, so write_stream wraps the dihedral
+                   targets onto -180 <= tref <= 180.
+                                                                         """
+
+import os, re, sys
+import numpy as np
+import pbc
+
+# restraint force constant of the .str files, kcal/mol/rad^2
+FORCE = 200.0
+
+# '# Image n' headers, also matches the '# Images n' written by the
+# push and nearest-neighbor scripts
+HEADER = re.compile(r'^[ \t]*#.*$', re.M)
+
+#---------#
+# Reading #
+#---------#
+
+def parse_values(text, fname='string'):
+  """Converts whitespace separated numbers to a flat array, a ValueError
+     naming the file and the token if one is not a number"""
+
+  tokens = text.split()
+  try:
+    return np.array(tokens, dtype=float)
+  except ValueError:
+    for token in tokens:
+      try:
+        float(token)
+      except ValueError:
+        raise ValueError('%s: %r is not a number' % (fname, token))
+    raise
+
+def parse_string(text, nvars, fname='string'):
+  """Parses the text of a string file into an (nimages, nvars) array"""
+
+  nheaders = 0
+  if '#' in text:
+    nheaders = len(HEADER.findall(text))
+    text = HEADER.sub(' ', text)
+  values = parse_values(text, fname)
+
+  if values.size % nvars:
+    raise ValueError('%s: %s values is not a multiple of nvars = %s'
+                     % (fname, values.size, nvars))
+  nimages = values.size // nvars
+  if nheaders and nheaders != nimages:
+    raise ValueError('%s: %s image headers but %s images of %s vars'
+                     % (fname, nheaders, nimages, nvars))
+
+  return values.reshape(nimages, nvars)
+
+def read_string(fname, nvars):
+  """Reads a '# Image n' string file into an (nimages, nvars) array"""
+
+  sfile = open(fname, 'r')
+  text = sfile.read()
+  sfile.close()
+
+  return parse_string(text, nvars, fname)
+
+def read_var(fname):
+  """Reads the col vars of a .var or .swm file into a flat array"""
+
+  vfile = open(fname, 'r')
+  text = vfile.read()
+  vfile.close()
+
+  return parse_values(HEADER.sub(' ', text), fname)
+
+def read_stream(fname):
+  """Returns the tref targets and force constants of a .str file"""
+
+  sfile = open(fname, 'r')
+  text = sfile.read()
+  sfile.close()
+
+  tref  = [float(val) for val in re.findall(r'tref\s+(\S+)', text)]
+  force = [float(val) for val in re.findall(r'force\s+(\S+)', text)]
+
+  return np.array(tref), np.array(force)
+
+def list_cycles(dat_dir, prefix='string_'):
+  """Returns the sorted cycle numbers of the <prefix><cycle>.dat files"""
+
+  pattern = re.compile(r'^%s(\d+)\.dat$' % re.escape(prefix))
+  matches = [pattern.match(fname) for fname in os.listdir(dat_dir)]
+
+  return sorted([int(m.group(1)) for m in matches if m])
+
+def read_run(dat_dir, nvars, prefix='string_'):
+  """Reads every <prefix><cycle>.dat of a run
+
+     Returns the cycle numbers and a list of (nimages, nvars) strings."""
+
+  cycles = list_cycles(dat_dir, prefix)
+  strings = [read_string(os.path.join(dat_dir, '%s%s.dat' % (prefix, cycle)),
+                         nvars) for cycle in cycles]
+
+  return cycles, strings
+
+#---------#
+# Writing #
+#---------#
+
+def format_string(string):
+  """Formats an (nimages, nvars) array as the text of a string file"""
+
+  string = np.asarray(string, dtype=float)
+  block = '# Image %s\n' + '%r\n' * string.shape[1]
+
+  return ''.join([block % ((img,) + tuple(row))
+                  for img, row in enumerate(string.tolist())])
+
+def write_string(out, string):
+  """Writes a string to a file name or an open file, in one write"""
+
+  text = format_string(string)
+
+  if hasattr(out, 'write'):
+    out.write(text)
+  else:
+    sfile = open(out, 'w')
+    sfile.write(text)
+    sfile.close()
+
+def print_string(string):
+  """Writes a string to stdout, for the scripts that are redirected"""
+
+  write_string(sys.stdout, string)
+
+#--------------#
+# Stream files #
+#--------------#
+
+STREAM = """\
+mmfp
+geo sphere dihedral - 
+  harmonic symmetric force %s tref %s dtoff 0.0 - 
+  select type CLP end   select type NL  end -
+  select type CA  end   select type CRP end
+end
+
+mmfp
+geo sphere dihedral - 
+  harmonic symmetric force %s tref %s dtoff 0.0 - 
+  select type NL  end   select type CA  end -
+  select type CRP end   select type NR  end
+end
+
+"""
+
+def format_stream(image, force=FORCE):
+  """Formats the PHI/PSI restraints of one image for run_string.inp, the
+     targets wrapped onto -180 <= tref <= 180"""
+
+  image = [repr(float(val)) for val in pbc.wrap(image).tolist()]
+
+  return ''.join([STREAM % (force, image[2 * coors], force, image[2 * coors + 1])
+                  for coors in range(len(image) // 2)])
+
+def write_stream(fname, image, force=FORCE):
+  """Writes the restraint stream file of one image"""
+
+  sfile = open(fname, 'w')
+  sfile.write(format_stream(image, force))
+  sfile.close()
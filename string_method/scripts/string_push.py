@@ -0,0 +1,111 @@
+#!/usr/bin/python
+
+""" string_push.py: Simulated annealing push of the string images
+
+      Usage: import string_push
+             pushed = string_push.push_string(string, cycle)
+
+      Description: Every evolved image of an (nimages, nvars) string is
+                   moved along a random direction normal to the link from
+                   the previous image, with a magnitude set by a simulated
+                   annealing schedule of the cycle number, by default the
+                   cosine curve (see annealing.py):
+
+                     0.5 * cos(2 pi cycle / period - pi) + 0.5
+
+                   The directions of all images are drawn at once for any
+                   nvars: isotropic random vectors with the link component
+                   projected out, so no single coordinate of a link has to
+                   be divided by. The start and stop images never move.
+
+                   The cycles where the push is not growing, past the peak
+                   of the cosine curve (period / 2), are optimization
+                   cycles, where the nearest-neighbor knot removal is
+                   applied.
+
+                   See push_string.py for the command line version.
+                                                                         """
+
+import numpy as np
+import annealing, pbc
+
+MULTIPLIER = 20.0    # push at the top of the curve
+MIN_NORM   = 1.e-8   # shortest projected direction that is normalized
+
+#------------------#
+# Helper Functions #
+#------------------#
+
+def get_schedule(cycle, schedule=None):
+  """The schedule given, else the default cosine one up to cycle"""
+
+  if schedule is None:
+    schedule = annealing.Schedule(ncycles=max(cycle, annealing.NCYCLES))
+
+  return schedule
+
+def simulated_annealing(cycle, schedule=None):
+  """Returns the fraction of the full push for a cycle number"""
+
+  return get_schedule(cycle, schedule).fraction(cycle)
+
+def calc_nn(cycle, schedule=None):
+  """True for the optimization cycles, where the push is not growing"""
+
+  return get_schedule(cycle, schedule).calc_nn(cycle)
+
+def push_directions(string, rng=None):
+  """Returns (nimages-2, nvars) random unit vectors, one per evolved image,
+     each normal to the link from the previous image
+
+     All directions are drawn at once from an isotropic normal distribution
+     and the component along the link is projected out. A direction left
+     (almost) parallel to its link is drawn again. rng is a numpy
+     RandomState, np.random by default."""
+
+  if rng is None:
+    rng = np.random
+
+  string = np.asarray(string, dtype=float)
+  nvars = string.shape[1]
+  angle = pbc.angle_masks(nvars)[0]
+
+  # links into every evolved image, minimum image for the angles
+  links = pbc.difference(string[:-2], string[1:-1], angle)
+  length = pbc.length(links, angle)
+
+  # repeated images have no link, any direction is normal to it
+  unit = np.zeros(links.shape)
+  moved = length > 0
+  unit[moved] = links[moved] / length[moved][:, np.newaxis]
+
+  # a single col var has no direction normal to a link
+  if nvars == 1:
+    return np.where(moved[:, np.newaxis], 0., np.sign(rng.normal(size=links.shape)))
+
+  directions = np.zeros(links.shape)
+  todo = np.arange(len(links))
+  while len(todo):
+    draw = rng.normal(size=(len(todo), nvars))
+    draw -= np.sum(draw * unit[todo], axis=1)[:, np.newaxis] * unit[todo]
+    norm = np.sqrt(np.sum(draw**2, axis=1))
+
+    ok = norm > MIN_NORM
+    directions[todo[ok]] = draw[ok] / norm[ok][:, np.newaxis]
+    todo = todo[~ok]
+
+  return directions
+
+#------#
+# Push #
+#------#
+
+def push_string(string, cycle, schedule=None, multiplier=MULTIPLIER, rng=None):
+  """Returns the (nimages, nvars) string pushed for this cycle"""
+
+  pushed = np.array(string, dtype=float)
+  sim_anneal = simulated_annealing(cycle, schedule)
+
+  pushed[1:-1] += push_directions(pushed, rng) * sim_anneal * multiplier
+
+  return pushed
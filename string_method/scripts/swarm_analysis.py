@@ -0,0 +1,172 @@
+#!/usr/bin/python
+
+""" swarm_analysis.py: Drift, covariance and effective sample size of the
+                       swarms of a cycle
+
+      Usage: python swarm_analysis.py <nvars> <nimg> <cycle> <ntraj> [periodic]
+
+      Description: For every evolved image the swarm end points are taken
+                   relative to the pushed start point of the image (the
+                   _pushed.var col vars, or string_pushed_<cycle>.dat once
+                   those are cleaned up), with the minimum image convention
+                   for the periodic col vars. From these displacements, for
+                   all images at once:
+
+                     drift - the mean displacement of the swarm
+                     cov   - the (nvars, nvars) covariance of the
+                             displacements, an estimate of the diffusion
+                             (metric) tensor of the image
+                     ess   - the effective sample size of each col var; the
+                             trajectories start from successive frames of one
+                             restrained run, so they are correlated:
+                             ess = ntraj / (1 + 2 sum rho_k), summing the
+                             autocorrelation rho_k over the trajectory index
+                             up to its first non-positive value
+
+                   The results are saved to swarm_summary_<cycle>.npz, so
+                   later analysis does not need the raw swarms:
+
+                     summary = swarm_analysis.read_summary(fname)
+                     summary['drift']     # (nimg-2, nvars)
+
+      Input: nvars - the number of col vars
+             nimg - the number of images
+             cycle - the iteration of the string method
+             ntraj - the number of trajectories in the swarm
+             periodic - one 0/1 flag per col var, e.g. 11 for phi,psi
+
+      Output: swarm_summary_<cycle>.npz - the summary of the cycle
+                                                                         """
+
+import os, sys
+import numpy as np
+import compute_string, get_pstring, pbc, string_io
+
+#------------------#
+# Helper Functions #
+#------------------#
+
+def summary_file(cycle):
+  """Returns the name of the swarm summary of a cycle"""
+
+  return 'swarm_summary_%s.npz' % cycle
+
+def displacements(swarms, start, periodic):
+  """(..., ntraj, nvars) swarm end points minus their (..., nvars) start"""
+
+  disp = swarms - start[..., np.newaxis, :]
+
+  # minimum image for the angles
+  return pbc.min_image(disp, periodic)
+
+def covariance(disp):
+  """(..., nvars, nvars) covariances of (..., ntraj, nvars) samples"""
+
+  ntraj = disp.shape[-2]
+  centered = disp - disp.mean(axis=-2)[..., np.newaxis, :]
+
+  return np.einsum('...ti,...tj->...ij', centered, centered) / (ntraj - 1)
+
+def autocorrelation(x):
+  """Normalized autocorrelation along the last axis, through an FFT"""
+
+  n = x.shape[-1]
+  centered = x - x.mean(axis=-1)[..., np.newaxis]
+  power = np.fft.rfft(centered, 2 * n, axis=-1)
+  acf = np.fft.irfft(power * np.conj(power), 2 * n, axis=-1)[..., :n]
+
+  # constant samples have no correlation
+  var = acf[..., :1]
+  return np.where(var > 0, acf / np.where(var > 0, var, 1.), 0.)
+
+def effective_sample_size(disp):
+  """(..., nvars) effective sample sizes of (..., ntraj, nvars) samples"""
+
+  ntraj = disp.shape[-2]
+  rho = autocorrelation(np.swapaxes(disp, -1, -2))[..., 1:]
+
+  # initial positive sequence: stop at the first rho_k <= 0
+  positive = np.cumprod(rho > 0, axis=-1)
+  tau = 1. + 2. * (rho * positive).sum(axis=-1)
+
+  return ntraj / tau
+
+#----------#
+# Analysis #
+#----------#
+
+def analyze(swarms, start, periodic):
+  """Drift, covariance and effective sample size of (nimg, ntraj, nvars)
+     swarms that started from (nimg, nvars)"""
+
+  disp = displacements(swarms, start, periodic)
+
+  return {'start': start,
+          'drift': disp.mean(axis=-2),
+          'cov':   covariance(disp),
+          'ess':   effective_sample_size(disp),
+          'ntraj': swarms.shape[-2],
+          'periodic': np.asarray(periodic, dtype=bool)}
+
+def pushed_string(nimg, cycle, nvars):
+  """The start points of the swarms, from the .var files while they exist"""
+
+  fname = 'string_pushed_%s.dat' % cycle
+  if os.path.exists(fname):
+    return string_io.read_string(fname, nvars)
+
+  return get_pstring.get_pstring(nimg, cycle)
+
+def analyze_cycle(nvars, nimg, cycle, ntraj, periodic=None, swarms=None,
+                  pushed=None):
+  """Analyzes the swarms of the evolved images of a cycle
+
+     swarms (compute_string.get_swarms) and the pushed string are only read
+     if not given."""
+
+  periodic = compute_string.periodic_mask(nvars, periodic)
+  if swarms is None:
+    swarms = compute_string.get_swarms(nvars, nimg, cycle, ntraj)
+  if pushed is None:
+    pushed = pushed_string(nimg, cycle, nvars)
+
+  images = np.arange(1, nimg-1)
+  start = pushed[1:-1]
+
+  summary = analyze(swarms, start, periodic)
+  summary['images'] = images
+
+  return summary
+
+def write_summary(fname, summary):
+  """Saves a summary as a compressed numpy archive"""
+
+  sfile = open(fname, 'wb')
+  np.savez_compressed(sfile, **summary)
+  sfile.close()
+
+def read_summary(fname):
+  """Loads a summary into a dict of arrays"""
+
+  data = np.load(fname)
+  summary = dict([(key, data[key]) for key in data.files])
+  data.close()
+
+  return summary
+
+#--------#
+#  MAIN  #
+#--------#
+
+if __name__ == '__main__':
+
+  nvars = int(sys.argv[1])
+  nimg  = int(sys.argv[2])
+  cycle = int(sys.argv[3])
+  ntraj = int(sys.argv[4])
+  periodic = None
+  if len(sys.argv) > 5:
+    periodic = [flag == '1' for flag in sys.argv[5]]
+
+  write_summary(summary_file(cycle),
+                analyze_cycle(nvars, nimg, cycle, ntraj, periodic))
@@ -0,0 +1,276 @@
+#!/usr/bin/python
+
+""" swarm_store.py: One binary file for all the swarms of a cycle
+
+      Usage: python swarm_store.py <nvars> <nimages> <cycle> [keep]
+
+      Description: Folds the img_<img>_cycle_<cycle>.swm<traj> files of a
+                   cycle into swarm_<cycle>.bin and removes them (unless keep
+                   is 1), so a cycle leaves one file instead of
+                   nimages x ntraj two-line files.
+
+                   Every image job writes its own trajectories to a shard,
+                   swarm_<cycle>.img<img>.bin, as it finishes (append_image,
+                   called by manage_image.py), so no two jobs ever write the
+                   same file, on one machine or on a shared file system.
+                   The .swm files are only removed once the shard has been
+                   read back and holds them. The serial section of the
+                   cycle merges the shards into swarm_<cycle>.bin (merge,
+                   called by string_cycle.clean_up).
+
+                   Readers map the files into memory and index the rows by
+                   (image, traj); open_cycle reads the store and the shards
+                   not merged yet together, and compute_string.py reads the
+                   swarms from them when they exist.
+
+                   Layout (little endian):
+                     8 bytes      magic 'SWMSTR01'
+                     int64        nvars
+                     zero padding up to 64 bytes
+                     records      int32 image, int32 traj, nvars float64
+
+                   Shards and the merged store have the same layout. Each
+                   is written whole under a temporary name and renamed into
+                   place, so a reader never sees part of one. The last
+                   record of an (image, traj) wins, shards over the store.
+
+      Input: nvars - the number of col vars
+             nimages - the number of images
+             cycle - the iteration of the string method
+             keep - 1 to keep the .swm files after packing them
+
+      Output: swarm_<cycle>.bin - the swarm store of the cycle
+                                                                         """
+
+import glob, os, re, struct, sys
+import numpy as np
+import string_io
+
+MAGIC  = b'SWMSTR01'
+HEADER = '<q'
+OFFSET = 64
+
+#------------------#
+# Helper Functions #
+#------------------#
+
+def store_file(cycle):
+  """Returns the name of the swarm store of a cycle"""
+
+  return 'swarm_%s.bin' % cycle
+
+def record_dtype(nvars):
+  """The on-disk record of one trajectory"""
+
+  return np.dtype([('image', '<i4'), ('traj', '<i4'), ('colvars', '<f8', (nvars,))])
+
+def shard_file(cycle, image):
+  """Returns the name of the shard of one image"""
+
+  return 'swarm_%s.img%s.bin' % (cycle, image)
+
+def shard_files(cycle):
+  """Returns the names of the shards of a cycle, in image order"""
+
+  pattern = re.compile(r'\.img(\d+)\.bin$')
+  shards = glob.glob('swarm_%s.img*.bin' % cycle)
+
+  return sorted(shards, key=lambda fname: int(pattern.search(fname).group(1)))
+
+def is_store_file(fname, cycle):
+  """True for the store and the shards of a cycle"""
+
+  return fname == store_file(cycle) or \
+         re.match(r'^swarm_%s\.img\d+\.bin$' % cycle, fname) is not None
+
+def exists(cycle):
+  """True if the cycle has a store or a shard"""
+
+  return os.path.exists(store_file(cycle)) or bool(shard_files(cycle))
+
+#---------#
+# Writing #
+#---------#
+
+def write(fname, records):
+  """Writes records to a store file, renamed into place when complete"""
+
+  nvars = records.dtype['colvars'].shape[0]
+  header = MAGIC + struct.pack(HEADER, nvars)
+
+  tmp = '%s.%s.tmp' % (fname, os.getpid())
+  sfile = open(tmp, 'wb')
+  sfile.write(header + b'\0' * (OFFSET - len(header)))
+  sfile.write(records.tobytes())
+  sfile.flush()
+  os.fsync(sfile.fileno())
+  sfile.close()
+
+  os.rename(tmp, fname)
+
+def make_records(images, trajs, colvars):
+  """The records of trajectories"""
+
+  colvars = np.asarray(colvars, dtype=float)
+  records = np.zeros(len(colvars), dtype=record_dtype(colvars.shape[1]))
+  records['image'] = images
+  records['traj'] = trajs
+  records['colvars'] = colvars
+
+  return records
+
+def swarm_files(cycle, image):
+  """Returns {traj: file} of the .swm files of an image"""
+
+  pattern = re.compile(r'\.swm(\d+)$')
+  files = {}
+  for fname in glob.glob('img_%s_cycle_%s.swm*' % (image, cycle)):
+    match = pattern.search(fname)
+    if match:
+      files[int(match.group(1))] = fname
+
+  return files
+
+def append_image(cycle, image, nvars, remove=True):
+  """Moves the .swm files of an image into its shard of the cycle"""
+
+  files = swarm_files(cycle, image)
+  if not files:
+    return 0
+
+  trajs = sorted(files)
+  colvars = np.array([string_io.read_var(files[traj]) for traj in trajs])
+  colvars = colvars.reshape(len(trajs), nvars)
+  fname = shard_file(cycle, image)
+  write(fname, make_records([image] * len(trajs), trajs, colvars))
+
+  # the .swm files go only once the shard is known to hold them
+  shard = SwarmStore(fname)
+  if len(shard) != len(trajs) or \
+     not np.array_equal(shard.swarm(image, trajs), colvars):
+    raise IOError('%s does not hold the %s trajectories of image %s, '
+                  'the .swm files are kept' % (fname, len(trajs), image))
+
+  if remove:
+    for traj in trajs:
+      os.remove(files[traj])
+
+  return len(trajs)
+
+def merge(cycle):
+  """Folds the shards of a cycle into its store, in the serial section"""
+
+  shards = shard_files(cycle)
+  if not shards:
+    return
+
+  store = open_cycle(cycle)
+  write(store_file(cycle), store.unique_records())
+
+  for fname in shards:
+    os.remove(fname)
+
+#---------#
+# Reading #
+#---------#
+
+def read_records(fname):
+  """Memory-mapped records of one store file"""
+
+  sfile = open(fname, 'rb')
+  magic = sfile.read(len(MAGIC))
+  if magic != MAGIC:
+    sfile.close()
+    raise ValueError('%s is not a swarm store' % fname)
+  nvars = struct.unpack(HEADER, sfile.read(struct.calcsize(HEADER)))[0]
+  sfile.close()
+
+  dtype = record_dtype(nvars)
+  nrows = (os.path.getsize(fname) - OFFSET) // dtype.itemsize
+  if nrows > 0:
+    return np.memmap(fname, dtype=dtype, mode='r', offset=OFFSET,
+                     shape=(nrows,))
+
+  return np.zeros(0, dtype=dtype)
+
+class SwarmStore:
+  """Memory-mapped view of a swarm store, or of several store files read
+     as one, later files winning
+
+     store.records holds the image, traj and colvars of every row."""
+
+  def __init__(self, fnames):
+
+    if isinstance(fnames, str):
+      fnames = [fnames]
+    parts = [read_records(fname) for fname in fnames]
+
+    self.fname = ', '.join(fnames)
+    self.nvars = parts[0].dtype['colvars'].shape[0]
+    if len(parts) == 1:
+      self.records = parts[0]
+    else:
+      self.records = np.concatenate(parts)
+
+    # (image, traj) -> row, later rows win
+    self.index = {}
+    keys = zip(self.records['image'].tolist(), self.records['traj'].tolist())
+    for row, key in enumerate(keys):
+      self.index[key] = row
+
+  def __len__(self):
+    return len(self.index)
+
+  def unique_records(self):
+    """The record of every (image, traj), in image and traj order"""
+
+    keys = sorted(self.index)
+
+    return self.records[[self.index[key] for key in keys]]
+
+  def row(self, image, traj):
+    """Returns the col vars of one trajectory"""
+
+    return self.records['colvars'][self.index[(image, traj)]]
+
+  def swarm(self, image, ntraj):
+    """Returns the (ntraj, nvars) swarm of an image, in trajectory order"""
+
+    trajs = ntraj
+    if isinstance(ntraj, int):
+      trajs = range(ntraj)
+
+    try:
+      rows = [self.index[(image, traj)] for traj in trajs]
+    except KeyError as err:
+      raise ValueError('%s: no trajectory %s of image %s'
+                       % (self.fname, err.args[0][1], image))
+
+    return self.records['colvars'][rows]
+
+def open_cycle(cycle):
+  """Returns the swarm store of a cycle with its shards, None if there is
+     none"""
+
+  fnames = shard_files(cycle)
+  if os.path.exists(store_file(cycle)):
+    fnames.insert(0, store_file(cycle))
+  if not fnames:
+    return None
+
+  return SwarmStore(fnames)
+
+#--------#
+#  MAIN  #
+#--------#
+
+if __name__ == '__main__':
+
+  nvars   = int(sys.argv[1])
+  nimages = int(sys.argv[2])
+  cycle   = int(sys.argv[3])
+  remove  = not (len(sys.argv) > 4 and sys.argv[4] == '1')
+
+  for image in range(nimages):
+    append_image(cycle, image, nvars, remove)
+  merge(cycle)